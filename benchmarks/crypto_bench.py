@@ -0,0 +1,203 @@
+# Micro-benchmarks of the election cryptography on the 160-bit curve, e.g.
+#
+#   python -m benchmarks.crypto_bench --output bench.json
+#   python -m benchmarks.crypto_bench --output bench.json --baseline baseline.json
+#
+# Each benchmark is timed with timeit (calls per sample chosen so a sample takes at least
+# --min-time seconds) and the per-call minimum and median over --repeat samples are written as
+# JSON. With --baseline, minimums are compared by benchmark name and parameters and the run
+# exits with status 1 if any is slower than the baseline by more than --threshold.
+#
+# benchmarks/baseline.json is the committed reference run (default cases, 9 samples); regenerate it
+# on the reference machine after an intended performance change with
+#
+#   python -m benchmarks.crypto_bench --repeat 9 --output benchmarks/baseline.json
+from entity.elliptic_curve import ECCPoint
+from entity.election_parameters import CurveParameters
+from entity.types import EccPointPair
+from entity.user import User
+from entity.voting_server import VotingServer
+from utils.math import get_random_relatively_prime_value
+from utils.field import FIELD
+from random import randint
+from typing import Callable, Dict, List, Optional
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import timeit
+
+# Curve used by the service (see .env.example); ECC_* environment variables override it.
+DEFAULT_CURVE = {
+    "ECC_A": 1268133167195989090596625406312984755854486256116,
+    "ECC_B": 386736940269827655214118852806596527602892573734,
+    "ECC_P": 1461501637330902918203684832716283019655932542983,
+    "ECC_ORDER": 1461501637330902918203684149283858612734394057783,
+}
+DEFAULT_CANDIDATES = (2, 4)
+DEFAULT_VOTERS = (10, 100)
+DEFAULT_THRESHOLD = 0.2
+RESULTS_VERSION = 1
+
+
+def _curve() -> CurveParameters:
+    a, b, p, order = (int(os.environ.get(name, value)) for name, value in DEFAULT_CURVE.items())
+    return CurveParameters(a, b, p, order)
+
+
+def _random_point(server: VotingServer) -> ECCPoint:
+    return server.precomputation.P.multiply(get_random_relatively_prime_value(server.order))
+
+
+def _load_tally(server: VotingServer, number_of_voters: int):
+    """Set the server's running tally to an encryption of `number_of_voters` random votes."""
+    counts = [0] * server.number_of_candidate
+    for _ in range(number_of_voters):
+        counts[randint(0, server.number_of_candidate - 1)] += 1
+    curve, precomputation = server.elliptic_curve, server.precomputation
+    r = get_random_relatively_prime_value(server.order)
+    message = curve.multi_multiply(counts, server.M) if number_of_voters else ECCPoint(0, 0, True)
+    ciphertext = EccPointPair(precomputation.P.multiply(r), curve.add(message, precomputation.Q.multiply(r)))
+    server._sum_A, server._sum_B = curve._to_jacobian(ciphertext.first), curve._to_jacobian(ciphertext.second)
+    server.number_of_voter = number_of_voters
+
+
+def _cases(candidates: List[int], voters: List[int]) -> List[Dict]:
+    """Return the benchmark cases, each a name, its parameters and the callable to time."""
+    curve = _curve()
+    window = int(os.environ.get("ECC_TABLE_WINDOW", "4"))
+    user = User("bench")
+    cases = []
+
+    server = VotingServer(2, 1, curve.a, curve.b, curve.p, curve.order, precomputation_window=window)
+    ecc = server.elliptic_curve
+    point_1, point_2 = _random_point(server), _random_point(server)
+    scalar = get_random_relatively_prime_value(server.order)
+    cases.append({"name": "ecc.add", "params": {}, "run": lambda: ecc.add(point_1, point_2)})
+    cases.append({"name": "ecc.multiply", "params": {}, "run": lambda: ecc.multiply(scalar, point_1)})
+    cases.append({
+        "name": "ecc.multiply_fixed_base", "params": {"window": window},
+        "run": lambda: server.precomputation.P.multiply(scalar)
+    })
+
+    for k in candidates:
+        server = VotingServer(k, max(voters), curve.a, curve.b, curve.p, curve.order, precomputation_window=window)
+        parameters = server.get_public_key()
+        encrypted_message, _, _, proof_of_work = user.vote(randint(0, k - 1), parameters)
+        cases.append({
+            "name": "user.vote", "params": {"candidates": k},
+            "run": lambda parameters=parameters, k=k: user.vote(randint(0, k - 1), parameters)
+        })
+        cases.append({
+            "name": "server.verify_vote", "params": {"candidates": k},
+            "run": lambda server=server, vote=encrypted_message, proof=proof_of_work: server._verify_vote(vote, proof)
+        })
+        for n in voters:
+            server = VotingServer(k, n, curve.a, curve.b, curve.p, curve.order, precomputation_window=window)
+            _load_tally(server, n)
+            decrypted_S, _ = server.decrypt_tally()
+            cases.append({
+                "name": "server.open_vote", "params": {"candidates": k, "voters": n},
+                "run": server.open_vote
+            })
+            cases.append({
+                "name": "server.solve", "params": {"candidates": k, "voters": n},
+                "run": lambda server=server, decrypted_S=decrypted_S, n=n: server._solve(decrypted_S, n)
+            })
+            # Both tally solvers on the same aggregate; without a loaded table, baby-step
+            # giant-step includes building one, as solve does.
+            cases.append({
+                "name": "tally.meet_in_the_middle", "params": {"candidates": k, "voters": n},
+                "run": lambda solver=server.tally_solver, decrypted_S=decrypted_S, n=n:
+                    solver.solve_meet_in_the_middle(decrypted_S, n)
+            })
+            cases.append({
+                "name": "tally.baby_step_giant_step", "params": {"candidates": k, "voters": n},
+                "run": lambda solver=server.tally_solver, decrypted_S=decrypted_S, n=n:
+                    solver.solve_baby_step_giant_step(decrypted_S, n)
+            })
+    return cases
+
+
+def _time(run: Callable, repeat: int, min_time: float) -> Dict:
+    timer = timeit.Timer(run)
+    loops = 1
+    while timer.timeit(loops) < min_time:
+        loops *= 2
+    samples = [timer.timeit(loops) / loops for _ in range(repeat)]
+    return {"loops": loops, "min_s": min(samples), "median_s": statistics.median(samples)}
+
+
+def _key(result: Dict) -> str:
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+
+def run_benchmarks(
+    candidates: List[int], voters: List[int], repeat: int = 5, min_time: float = 0.1, only: Optional[str] = None
+) -> Dict:
+    """Run the benchmarks and return the results document."""
+    results = []
+    for case in _cases(candidates, voters):
+        if only and only not in case["name"]:
+            continue
+        result = {"name": case["name"], "params": case["params"], **_time(case["run"], repeat, min_time)}
+        print(f"{_key(result):60} {result['min_s'] * 1e3:10.3f} ms  (median {result['median_s'] * 1e3:.3f} ms)")
+        results.append(result)
+    return {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "curve_bits": _curve().p.bit_length(),
+        "field_backend": FIELD.name,
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    """Return the benchmarks whose minimum is more than `threshold` slower than in the baseline."""
+    baseline_results = {_key(result): result for result in baseline["results"]}
+    regressions = []
+    for result in current["results"]:
+        previous = baseline_results.get(_key(result))
+        if previous is None:
+            continue
+        ratio = result["min_s"] / previous["min_s"]
+        flag = "REGRESSION" if ratio > 1 + threshold else ("faster" if ratio < 1 - threshold else "")
+        print(f"{_key(result):60} {ratio:6.2f}x baseline  {flag}")
+        if ratio > 1 + threshold:
+            regressions.append({"name": result["name"], "params": result["params"], "ratio": ratio})
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the election cryptography.")
+    parser.add_argument("--output", help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", help="Compare against results previously written with --output.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown reported as a regression (default 0.2).")
+    parser.add_argument("--candidates", type=int, nargs="+", default=list(DEFAULT_CANDIDATES))
+    parser.add_argument("--voters", type=int, nargs="+", default=list(DEFAULT_VOTERS))
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per benchmark.")
+    parser.add_argument("--min-time", type=float, default=0.1, help="Minimum seconds per sample.")
+    parser.add_argument("--only", help="Run only benchmarks whose name contains this string.")
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.candidates, args.voters, args.repeat, args.min_time, args.only)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
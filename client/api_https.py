@@ -1,9 +1,41 @@
-from fastapi import FastAPI, HTTPException
-from entity.voting_server import VotingServer
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.concurrency import run_in_threadpool as fastapi_run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from entity.voting_server import VotingServer, ElectionData
+from entity.ecc_point import ECCPoint
+from entity.types import IntPair, EccPointPair, ProofOfWork
 from fastapi.middleware.cors import CORSMiddleware
 from entity.user import User
+from entity.wire_format import WireCodec
+from entity.election_parameters import CurveParameters
+from entity.server_snapshot import write_snapshot, load_snapshot
+from entity import election_tasks
+from client.crypto_executor import CryptoExecutor, EndpointLimiter
+from utils.key_pool import RSAKeyPool
+from utils import metrics
+from utils.metrics import SamplingProfiler
+from db.db import make_engine, make_session_factory
+from db.init_db import init_db
+from db.models import UserModel, BallotModel
+from db.repo import UserRepository, VotingServerRepository, BallotRepository
+from db.group_commit import GroupCommitWriter
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import lru_cache, partial
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+import asyncio
+import json
 import os
+import uuid
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
 
 class CreateVotingServerRequest(BaseModel):
     number_of_candidates: int
@@ -21,9 +53,56 @@ class VoteRequest(BaseModel):
     server_id: str
     candidate_id: int
 
+class BatchBallot(BaseModel):
+    user_id: str
+    candidate_id: int
+
+class BatchVoteRequest(BaseModel):
+    server_id: str
+    ballots: List[BatchBallot]
+
 class OpenVoteRequest(BaseModel):
     server_id: str
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    global key_pool, crypto_executor, db_writer
+    if int(value_key_pool_size) > 0:
+        key_pool = RSAKeyPool(capacity=int(value_key_pool_size), workers=int(value_key_pool_workers))
+    if int(value_crypto_workers) > 0:
+        crypto_executor = CryptoExecutor(max_workers=int(value_crypto_workers))
+    for name in ("create_voting_server", "create_user", "vote", "vote_batch", "precompute_tally", "open_vote"):
+        limiters[name] = EndpointLimiter(
+            name,
+            max_concurrency=int(os.environ.get(f"{name.upper()}_MAX_CONCURRENCY", value_max_concurrency)),
+            max_queue=int(os.environ.get(f"{name.upper()}_MAX_QUEUE", value_max_queue)),
+        )
+    if value_database_url:
+        engine = make_engine(value_database_url)
+        init_db(engine)
+        session_factory = make_session_factory(engine)
+        recover_from_database(session_factory)
+        db_writer = GroupCommitWriter(session_factory, on_reset=resume_ballot_logs)
+    elif value_snapshot_dir:
+        recover_from_snapshots()
+    yield
+    for server in voting_servers.values():
+        server.shutdown_verification_pool()
+    if value_snapshot_dir:
+        save_snapshots()
+    if db_writer is not None:
+        db_writer.close()
+        db_writer = None
+        engine.dispose()
+    if key_pool is not None:
+        key_pool.shutdown()
+        key_pool = None
+    if crypto_executor is not None:
+        crypto_executor.shutdown()
+        crypto_executor = None
+    limiters.clear()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = ["*"]
 
@@ -38,47 +117,269 @@ app.add_middleware(
 # In-memory storage for servers and users
 voting_servers = {}
 users = {}
+# Ids of servers being stored, not yet in voting_servers.
+pending_server_ids = set()
+# Folded stacks of the most recent profiled requests, by profile id.
+profiles: "OrderedDict[str, str]" = OrderedDict()
+key_pool: Optional[RSAKeyPool] = None
+crypto_executor: Optional[CryptoExecutor] = None
+db_writer: Optional[GroupCommitWriter] = None
+limiters: Dict[str, EndpointLimiter] = {}
 
 value_a = os.environ.get("ECC_A")
 value_b = os.environ.get("ECC_B")
 value_p = os.environ.get("ECC_P")
 value_order = os.environ.get("ECC_ORDER")
+value_table_window = os.environ.get("ECC_TABLE_WINDOW", "4")
+# Number of worker processes verifying ballot proofs per voting server (0 verifies inline).
+value_verify_workers = os.environ.get("VERIFY_WORKERS", "0")
+# Number of pre-generated voter RSA keys and the worker processes refilling them (0 disables the pool).
+value_key_pool_size = os.environ.get("RSA_KEY_POOL_SIZE", "16")
+value_key_pool_workers = os.environ.get("RSA_KEY_POOL_WORKERS", "1")
+# Directory for precomputed tally (baby-step) tables.
+value_tally_table_dir = os.environ.get("TALLY_TABLE_DIR", "tally_tables")
+# Number of worker processes for voting, key generation and tallying (0 runs them in the threadpool).
+value_crypto_workers = os.environ.get("CRYPTO_WORKERS", "1")
+# Default per-endpoint limits on running and waiting requests; override with e.g. VOTE_MAX_CONCURRENCY.
+value_max_concurrency = os.environ.get("ENDPOINT_MAX_CONCURRENCY", "8")
+value_max_queue = os.environ.get("ENDPOINT_MAX_QUEUE", "64")
+# Number of ballots of a batch vote request encrypted and verified together.
+value_vote_batch_chunk = os.environ.get("VOTE_BATCH_CHUNK", "32")
+# Largest number of ballots returned by one page of publish_result/{server_id}/ballots.
+value_publish_page_limit = os.environ.get("PUBLISH_PAGE_LIMIT", "1000")
+# Database for servers, users and accepted ballots, e.g. sqlite:///e_voting.db or postgresql://...
+# (empty keeps everything in memory only).
+value_database_url = os.environ.get("DATABASE_URL", "")
+# Directory for server snapshots, written on shutdown and loaded on start-up (empty disables them).
+value_snapshot_dir = os.environ.get("SNAPSHOT_DIR", "")
+# Allow sampling-profiling requests sent with "X-Profile: 1", keeping the last PROFILE_HISTORY profiles.
+value_profile_requests = os.environ.get("PROFILE_REQUESTS", "0")
+value_profile_interval = os.environ.get("PROFILE_INTERVAL", "0.001")
+value_profile_history = os.environ.get("PROFILE_HISTORY", "32")
 
-@app.post("/internal/v1/create_voting_server")
-def create_voting_server(request: CreateVotingServerRequest):
-    server_id = f"server_{request.server_name}_{len(voting_servers) + 1}"
-    voting_servers[server_id] = VotingServer(
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """Sample the process's stacks while a request sent with "X-Profile: 1" is handled."""
+    if value_profile_requests.lower() not in ("1", "true", "yes") or request.headers.get("X-Profile") != "1":
+        return await call_next(request)
+    # Only the threadpool threads and worker tasks running this request's work are sampled: the
+    # event loop and the other threads are shared with other requests.
+    profiler = SamplingProfiler(float(value_profile_interval), thread_ids=set()).start()
+    token = profiler.attach()
+    try:
+        response = await call_next(request)
+    finally:
+        profiler.detach(token)
+        profiler.stop()
+    profile_id = uuid.uuid4().hex
+    profiles[profile_id] = profiler.folded()
+    while len(profiles) > int(value_profile_history):
+        profiles.popitem(last=False)
+    response.headers["X-Profile-Id"] = profile_id
+    return response
+
+async def run_in_threadpool(fn, *args, **kwargs):
+    """Run blocking work in the threadpool, sampled there if the request is being profiled."""
+    return await fastapi_run_in_threadpool(metrics.call_profiled, fn, *args, **kwargs)
+
+async def run_crypto(fn, *args):
+    """Run CPU-bound work in the crypto executor, or in the threadpool when it is disabled."""
+    if crypto_executor is None:
+        return await run_in_threadpool(fn, *args)
+    return await crypto_executor.run(fn, *args)
+
+# Election objects use __slots__, so jsonable_encoder is given their plain forms explicitly.
+JSON_ENCODERS = {
+    ECCPoint: ECCPoint.to_dict,
+    IntPair: IntPair.to_dict,
+    EccPointPair: EccPointPair.to_dict,
+    ProofOfWork: ProofOfWork.to_dict,
+    ElectionData: ElectionData.to_dict,
+}
+
+def to_json(value):
+    """Convert election objects to JSON-compatible values."""
+    return jsonable_encoder(value, custom_encoder=JSON_ENCODERS)
+
+def election_etag(server: VotingServer) -> str:
+    """ETag of the published election data; it changes when a ballot is recorded or the vote is opened."""
+    data = server.election_data
+    return f'"{data.ballot_count()}-{len(data.result_package)}"'
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Whether the request's If-None-Match already names `etag`."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+def snapshot_path(server_id: str) -> str:
+    return os.path.join(value_snapshot_dir, f"{server_id}.snap")
+
+def load_server_snapshot(server_id: str) -> Optional[VotingServer]:
+    """Load the server's snapshot, or None if there is no usable one."""
+    if not value_snapshot_dir or not os.path.exists(snapshot_path(server_id)):
+        return None
+    try:
+        return load_snapshot(snapshot_path(server_id))
+    except ValueError:
+        return None
+
+def add_voting_server(server_id: str, server: VotingServer):
+    if int(value_verify_workers) > 0:
+        server.start_verification_pool(int(value_verify_workers))
+    voting_servers[server_id] = server
+
+def recover_from_snapshots():
+    """Load every server snapshot in the snapshot directory."""
+    if not os.path.isdir(value_snapshot_dir):
+        return
+    for name in sorted(os.listdir(value_snapshot_dir)):
+        if name.endswith(".snap"):
+            server = load_server_snapshot(name[:-len(".snap")])
+            if server is not None:
+                add_voting_server(name[:-len(".snap")], server)
+
+def recover_from_database(session_factory):
+    """
+    Reload servers and users. Each server resumes from its snapshot when that matches the
+    stored keys and holds no uncommitted ballots; the rest of its ballot log is then replayed
+    to rebuild the running tally.
+    """
+    with session_factory() as session:
+        ballot_repository = BallotRepository(session)
+        for server_id, parameters in VotingServerRepository(session).load_voting_server_parameters():
+            server = load_server_snapshot(server_id)
+            if server is None or (server._d, server.P) != (parameters["private_key"], parameters["base_point"]) or \
+                    server.election_data.ballot_count() > ballot_repository.count_ballots(server_id):
+                server = VotingServer(**parameters)
+            server.restore_ballots(ballot_repository.iter_ballots(server_id, server.election_data.ballot_count()))
+            server.ballot_log = partial(log_ballot, server_id)
+            add_voting_server(server_id, server)
+        users.update(UserRepository(session).load_users())
+
+def save_snapshots():
+    os.makedirs(value_snapshot_dir, exist_ok=True)
+    for server_id, server in voting_servers.items():
+        write_snapshot(server, snapshot_path(server_id))
+
+def log_ballot(server_id: str, seq: int, records) -> Future:
+    """Queue an accepted ballot for the next group commit."""
+    return db_writer.submit(BallotModel, BallotRepository.to_row(server_id, seq, records))
+
+def resume_ballot_logs():
+    """Let servers that rolled back ballots after a failed group commit accept ballots again."""
+    for server in list(voting_servers.values()):
+        server.resume_ballot_log()
+
+def save_voting_server(server_id: str, server_name: str, server: VotingServer):
+    with db_writer.session_factory() as session:
+        VotingServerRepository(session).create_voting_server(server_id, server_name, server)
+        session.commit()
+
+@lru_cache(maxsize=None)
+def election_curve() -> CurveParameters:
+    """Return the configured curve, parsed once and shared by every voting server."""
+    return CurveParameters(int(value_a), int(value_b), int(value_p), int(value_order))
+
+def new_voting_server(request: CreateVotingServerRequest) -> VotingServer:
+    curve = election_curve()
+    server = VotingServer(
         _number_of_candidate=request.number_of_candidates,
         maximum_number_of_voter=request.maximum_number_of_voters,
-        value_a=int(value_a),
-        value_b=int(value_b),
-        value_p=int(value_p),
-        value_order=int(value_order),
+        value_a=curve.a,
+        value_b=curve.b,
+        value_p=curve.p,
+        value_order=curve.order,
+        precomputation_window=int(value_table_window),
     )
+    if int(value_verify_workers) > 0:
+        server.start_verification_pool(int(value_verify_workers))
+    return server
+
+@app.post("/internal/v1/create_voting_server")
+async def create_voting_server(request: CreateVotingServerRequest):
+    async with limiters["create_voting_server"]:
+        server = await run_in_threadpool(new_voting_server, request)
+    number = len(voting_servers) + 1
+    while f"server_{request.server_name}_{number}" in voting_servers.keys() | pending_server_ids:
+        number += 1
+    server_id = f"server_{request.server_name}_{number}"
+    if db_writer is not None:
+        # The server is published only once it is stored and logs its ballots, so none is lost.
+        pending_server_ids.add(server_id)
+        try:
+            await run_in_threadpool(save_voting_server, server_id, request.server_name, server)
+        except Exception:
+            server.shutdown_verification_pool()
+            raise
+        finally:
+            pending_server_ids.discard(server_id)
+        server.ballot_log = partial(log_ballot, server_id)
+    voting_servers[server_id] = server
     return {"server_id": server_id}
 
 @app.get("/internal/v1/voting_server/is_exist/{server_id}")
-def voting_server_is_exist(server_id: str):
+async def voting_server_is_exist(server_id: str):
     if server_id in voting_servers:
         return {"exists": True}
     else:
         return {"exists": False}
 
 @app.post("/internal/v1/create_user")
-def create_user(request: CreateUserRequest):
+async def create_user(request: CreateUserRequest):
+    async with limiters["create_user"]:
+        rsa_key = key_pool.take() if key_pool is not None else None
+        if rsa_key is not None:
+            # A pooled key only needs the cheap CRT setup.
+            user = await run_in_threadpool(User, request.user_name, rsa_key=rsa_key)
+        else:
+            # Pool empty (counted as a miss): generate the key off the event loop instead.
+            user = await run_crypto(election_tasks.create_user, request.user_name)
     user_id = f"user_{request.user_name}_{len(users) + 1}"
-    users[user_id] = User(request.user_name)
+    users[user_id] = user
+    if db_writer is not None:
+        try:
+            await asyncio.wrap_future(db_writer.submit(UserModel, UserRepository.to_row(user_id, user)))
+        except Exception:
+            users.pop(user_id)
+            raise
     return CreateUserResponse(user_id=user_id)
 
+@app.get("/internal/v1/key_pool/stats")
+async def key_pool_stats():
+    if key_pool is None:
+        raise HTTPException(status_code=404, detail="Key pool is disabled")
+    return key_pool.stats()
+
+@app.get("/internal/v1/executor/stats")
+async def executor_stats():
+    return {
+        "crypto_executor": crypto_executor.stats() if crypto_executor is not None else None,
+        "endpoints": {name: limiter.stats() for name, limiter in limiters.items()},
+        "database_writer": db_writer.stats() if db_writer is not None else None,
+    }
+
+@app.get("/metrics")
+async def get_metrics():
+    return Response(content=metrics.REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/profiles/{profile_id}")
+async def get_profile(profile_id: str):
+    if profile_id not in profiles:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(content=profiles[profile_id], media_type="text/plain")
+
 @app.get("/internal/v1/is_exist/{user_id}")
-def is_exist(user_id: str):
+async def is_exist(user_id: str):
     if user_id in users:
         return {"exists": True}
     else:
         return {"exists": False}
 
 @app.post("/internal/v1/vote")
-def vote(request: VoteRequest):
+async def vote(request: VoteRequest):
     if request.server_id not in voting_servers:
         raise HTTPException(status_code=404, detail="Voting server not found")
     if request.user_id not in users:
@@ -87,31 +388,201 @@ def vote(request: VoteRequest):
     server = voting_servers[request.server_id]
     user = users[request.user_id]
 
-    try:
-        user_vote = user.vote(request.candidate_id, server.get_public_key())
-        server.cast_vote(user_vote)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    async with limiters["vote"]:
+        try:
+            user_vote = await run_crypto(election_tasks.vote, user, request.candidate_id, server.public_parameters())
+            executor = crypto_executor.executor if crypto_executor is not None else None
+            verification = await run_in_threadpool(server.submit_vote, user_vote, executor)
+            accepted = await asyncio.wrap_future(verification)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
+    if not accepted:
+        raise HTTPException(status_code=400, detail="Invalid proof of work.")
     return {"message": "Vote cast successfully"}
 
+@app.post("/internal/v1/vote/batch")
+async def vote_batch(request: BatchVoteRequest):
+    if request.server_id not in voting_servers:
+        raise HTTPException(status_code=404, detail="Voting server not found")
+
+    server = voting_servers[request.server_id]
+    limiter = limiters["vote_batch"]
+    # Take the slot before the 200 status is sent, so a full queue is still answered with 503.
+    await limiter.acquire()
+    released = False
+
+    def release():
+        nonlocal released
+        if not released:
+            released = True
+            limiter.release()
+
+    async def results():
+        """Yield one JSON line per ballot, chunk by chunk, as soon as the chunk is verified."""
+        try:
+            chunk_size = max(int(value_vote_batch_chunk), 1)
+            executor = crypto_executor.executor if crypto_executor is not None else None
+            for start in range(0, len(request.ballots), chunk_size):
+                chunk = list(enumerate(request.ballots[start:start + chunk_size], start))
+                lines = {}
+                known = []
+                for index, ballot in chunk:
+                    if ballot.user_id in users:
+                        known.append((index, ballot))
+                    else:
+                        lines[index] = {"accepted": False, "detail": "User not found"}
+
+                encrypted = await run_crypto(
+                    election_tasks.vote_many,
+                    [(users[ballot.user_id], ballot.candidate_id) for _, ballot in known],
+                    server.public_parameters()
+                )
+                votes, vote_indexes = [], []
+                for (index, _), (user_vote, error) in zip(known, encrypted):
+                    if user_vote is None:
+                        lines[index] = {"accepted": False, "detail": error}
+                    else:
+                        votes.append(user_vote)
+                        vote_indexes.append(index)
+
+                try:
+                    accepted = await run_in_threadpool(server.cast_votes_batch, votes, executor)
+                except Exception as e:
+                    # The 200 status is already sent: report the failure on the chunk's lines.
+                    for index in vote_indexes:
+                        lines[index] = {"accepted": False, "detail": str(e)}
+                else:
+                    for index, ok in zip(vote_indexes, accepted):
+                        lines[index] = {"accepted": True} if ok else {"accepted": False, "detail": "Invalid proof of work."}
+
+                for index, ballot in chunk:
+                    yield json.dumps({"index": index, "user_id": ballot.user_id, **lines[index]}) + "\n"
+        finally:
+            release()
+
+    # The background task frees the slot if the client goes away before streaming starts.
+    return StreamingResponse(results(), media_type="application/x-ndjson", background=BackgroundTask(release))
+
+@app.post("/internal/v1/snapshot")
+async def snapshot(request: OpenVoteRequest):
+    if request.server_id not in voting_servers:
+        raise HTTPException(status_code=404, detail="Voting server not found")
+    if not value_snapshot_dir:
+        raise HTTPException(status_code=404, detail="Snapshots are disabled")
+
+    os.makedirs(value_snapshot_dir, exist_ok=True)
+    await run_in_threadpool(write_snapshot, voting_servers[request.server_id], snapshot_path(request.server_id))
+    return {"message": "Snapshot written"}
+
+@app.post("/internal/v1/precompute_tally")
+async def precompute_tally(request: OpenVoteRequest):
+    if request.server_id not in voting_servers:
+        raise HTTPException(status_code=404, detail="Voting server not found")
+
+    server = voting_servers[request.server_id]
+    os.makedirs(value_tally_table_dir, exist_ok=True)
+    path = os.path.join(value_tally_table_dir, f"{request.server_id}.bsgs")
+    async with limiters["precompute_tally"]:
+        await run_crypto(election_tasks.write_tally_table, server.public_parameters(), path)
+        await run_in_threadpool(server.load_tally_table, path)
+    return {"message": "Tally table precomputed"}
+
 @app.post("/internal/v1/open_vote")
-def open_vote(request: OpenVoteRequest):
+async def open_vote(request: OpenVoteRequest):
     if request.server_id not in voting_servers:
         raise HTTPException(status_code=404, detail="Voting server not found")
 
     server = voting_servers[request.server_id]
-    try:
-        results = server.open_vote()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    async with limiters["open_vote"]:
+        try:
+            decrypted_S, number_of_voter = await run_in_threadpool(server.decrypt_tally)
+            counts = await run_crypto(
+                election_tasks.solve_tally, server.public_parameters(), decrypted_S, number_of_voter,
+                server.tally_solver.table_path
+            )
+            results = server.record_results(counts)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
     return {"results": results}
 
 @app.get("/internal/v1/publish_result/{server_id}")
-def publish_result(server_id: str):
+async def publish_result(server_id: str, request: Request, format: str = "json"):
+    if server_id not in voting_servers:
+        raise HTTPException(status_code=404, detail="Voting server not found")
+
+    server = voting_servers[server_id]
+    etag = election_etag(server)
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    if format == "json":
+        content = await run_in_threadpool(to_json, server.public_result())
+        return JSONResponse(content=content, headers={"ETag": etag})
+
+    codec = WireCodec(server.curve)
+    if format == "binary":
+        content = await run_in_threadpool(codec.encode_election_data, server.public_result())
+        return Response(content=content, media_type="application/octet-stream", headers={"ETag": etag})
+    if format == "msgpack":
+        if msgpack is None:
+            raise HTTPException(status_code=501, detail="msgpack is not installed")
+        primitives = await run_in_threadpool(codec.election_data_to_primitives, server.public_result())
+        return Response(content=msgpack.packb(primitives), media_type="application/msgpack", headers={"ETag": etag})
+    raise HTTPException(status_code=400, detail=f"Unknown format: {format}")
+
+@app.get("/internal/v1/publish_result/{server_id}/summary")
+async def publish_summary(server_id: str, request: Request):
+    if server_id not in voting_servers:
+        raise HTTPException(status_code=404, detail="Voting server not found")
+
+    server = voting_servers[server_id]
+    etag = election_etag(server)
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(content=to_json(server.public_summary()), headers={"ETag": etag})
+
+@app.get("/internal/v1/publish_result/{server_id}/ballots")
+async def publish_ballots(server_id: str, request: Request, cursor: int = 0, limit: int = 100, format: str = "ndjson"):
     if server_id not in voting_servers:
         raise HTTPException(status_code=404, detail="Voting server not found")
+    if cursor < 0 or not 0 < limit <= int(value_publish_page_limit):
+        raise HTTPException(status_code=400, detail="Invalid cursor or limit")
+    if format not in ("ndjson", "binary"):
+        raise HTTPException(status_code=400, detail=f"Unknown format: {format}")
 
     server = voting_servers[server_id]
-    return server.public_result()
\ No newline at end of file
+    etag = election_etag(server)
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    data = server.election_data
+    number_of_ballots = data.ballot_count()
+    stop = min(cursor + limit, number_of_ballots)
+    headers = {"ETag": etag, "X-Total-Count": str(number_of_ballots)}
+    if stop < number_of_ballots:
+        headers["X-Next-Cursor"] = str(stop)
+
+    if format == "binary":
+        codec = WireCodec(server.curve)
+
+        def records():
+            """Yield each ballot as a u32 length followed by its wire encoding."""
+            for ballot in data.iter_ballots(cursor, stop):
+                record = codec.encode_ballot(ballot)
+                yield len(record).to_bytes(4, "big") + record
+
+        return StreamingResponse(records(), media_type="application/octet-stream", headers=headers)
+
+    def lines():
+        """Yield each ballot as one JSON line."""
+        for index, (vote, public_key, signed_message, proof_of_work) in enumerate(data.iter_ballots(cursor, stop), cursor):
+            yield json.dumps(to_json({
+                "index": index,
+                "vote": vote,
+                "public_key": public_key,
+                "signed_message": signed_message,
+                "proof_of_work": proof_of_work,
+            })) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers=headers)
@@ -0,0 +1,109 @@
+from concurrent.futures import ProcessPoolExecutor
+from fastapi import HTTPException
+from utils import metrics
+from typing import Callable, Dict, Optional
+import asyncio
+import threading
+
+
+class CryptoExecutor:
+    """Process pool for CPU-bound crypto work, keeping the event loop free for cheap requests."""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self._executor = ProcessPoolExecutor(max_workers=max_workers)
+        self.max_workers = self._executor._max_workers
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        """Return the underlying process pool."""
+        return self._executor
+
+    def submit(self, fn: Callable, *args):
+        """Schedule fn(*args) in a worker process and return a concurrent future."""
+        with self._lock:
+            self.submitted += 1
+        future = metrics.submit(self._executor, fn, *args)
+        future.add_done_callback(self._on_done)
+        return future
+
+    async def run(self, fn: Callable, *args):
+        """Run fn(*args) in a worker process and await its result."""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def _on_done(self, _):
+        with self._lock:
+            self.completed += 1
+
+    def stats(self) -> Dict:
+        """Return the worker count and the number of queued or running jobs."""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "queue_depth": self.submitted - self.completed,
+            }
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class EndpointLimiter:
+    """
+    Caps the number of concurrent requests of one endpoint. Requests beyond the cap wait,
+    and once `max_queue` requests are already waiting new ones are rejected with 503.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.completed = 0
+
+    def check(self):
+        """Raise 503 if a new request would have to queue behind `max_queue` waiting ones."""
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail=f"Too many pending {self.name} requests")
+
+    async def acquire(self):
+        """Wait for a free slot, raising 503 if too many requests are already waiting."""
+        self.check()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self):
+        """Free a slot taken by `acquire`."""
+        self.active -= 1
+        self.completed += 1
+        self._semaphore.release()
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *_):
+        self.release()
+
+    def stats(self) -> Dict:
+        """Return the in-flight, waiting, rejected and completed request counts."""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "completed": self.completed,
+        }
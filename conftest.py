@@ -0,0 +1,2 @@
+# Marks the repository root for pytest, which puts this directory on sys.path so the tests can
+# import entity, utils and client however pytest is started (e.g. plain `pytest tests`).
@@ -0,0 +1,126 @@
+from concurrent.futures import Future
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+from typing import Callable, Dict, List, Optional, Tuple
+import queue
+import threading
+
+# Largest number of rows written in one transaction.
+DEFAULT_MAX_BATCH = 512
+
+_STOP = object()
+_RESET = object()
+
+
+class GroupCommitWriter:
+    """
+    Writes rows from one background thread. Whatever is queued while a commit is in flight
+    becomes the next batch: one bulk insert per table and a single commit. Each submitted row
+    gets a future that completes once its batch is committed.
+
+    A failed batch fails its rows and every row queued or submitted until the writer has worked
+    through its queue, so nothing submitted after a lost row is ever reported as durable. The
+    writer then resets, calls `on_reset` (e.g. to let servers that rolled back accept ballots
+    again) and writes later rows as usual.
+    """
+
+    def __init__(
+        self, session_factory: sessionmaker, max_batch: int = DEFAULT_MAX_BATCH,
+        on_reset: Optional[Callable[[], None]] = None
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.on_reset = on_reset
+        self.batches = 0
+        self.rows = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._queue: "queue.Queue" = queue.Queue()
+        # Makes checking for a failure and queueing a row atomic with failing and queueing the reset.
+        self._lock = threading.Lock()
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, model, row: Dict) -> Future:
+        """Queue a row for insertion into `model`'s table."""
+        future: Future = Future()
+        with self._lock:
+            error = self._error
+            if error is None:
+                self._queue.put((model, row, future))
+        if error is not None:
+            future.set_exception(error)
+        return future
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = []
+            while item is not _STOP and item is not _RESET:
+                batch.append(item)
+                if len(batch) == self.max_batch:
+                    item = None
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    item = None
+                    break
+            if batch:
+                self._write(batch)
+            if item is _RESET:
+                self._reset()
+            elif item is _STOP:
+                return
+
+    def _write(self, batch: List[Tuple[object, Dict, Future]]):
+        error = self._error
+        if error is None:
+            tables: Dict[object, List[Dict]] = {}
+            for model, row, _ in batch:
+                tables.setdefault(model, []).append(row)
+            try:
+                with self.session_factory() as session:
+                    for model, rows in tables.items():
+                        session.execute(insert(model), rows)
+                    session.commit()
+            except Exception as e:
+                error = e
+                self.failures += 1
+                self.last_error = repr(e)
+                with self._lock:
+                    self._error = e
+                    self._queue.put(_RESET)
+            else:
+                self.batches += 1
+                self.rows += len(batch)
+
+        for _, _, future in batch:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(None)
+
+    def _reset(self):
+        # Every row queued before the failure has been failed; accept rows again.
+        with self._lock:
+            self._error = None
+        if self.on_reset is not None:
+            self.on_reset()
+
+    def stats(self) -> Dict:
+        """Return the committed batches and rows, the queue depth and the failed batches."""
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "queue_depth": self._queue.qsize(),
+            "failed": self._error is not None,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+    def close(self):
+        """Write everything queued so far and stop the writer thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
@@ -1,8 +1,9 @@
-from db import Base, engine
-from models import UserModel, VotingServerModel
+from db.db import Base, make_engine
+from db.models import UserModel, VotingServerModel, BallotModel
+import os
 
-def init_db():
+def init_db(engine):
     Base.metadata.create_all(bind=engine)
 
 if __name__ == "__main__":
-    init_db()
\ No newline at end of file
+    init_db(make_engine(os.environ.get("DATABASE_URL", "sqlite:///e_voting.db")))
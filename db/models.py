@@ -1,24 +1,45 @@
-from sqlalchemy import Column, Integer, String, JSON
-from db import Base
+from sqlalchemy import Column, ForeignKey, Integer, LargeBinary, String
+from db.db import Base
+
+# Big integers are stored as fixed-width big-endian bytes: curve values use the width of
+# max(p, order), RSA values use the widths of entity.ballot_store.
+
 
 class UserModel(Base):
     __tablename__ = "users"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(String, primary_key=True)
     user_name = Column(String, nullable=False)
-    public_key = Column(String, nullable=False)
-    p = Column(String, nullable=False)
-    q = Column(String, nullable=False)
-    e = Column(String, nullable=False)
-    d = Column(String, nullable=False)
-    phi = Column(String, nullable=False)
+    p = Column(LargeBinary, nullable=False)
+    q = Column(LargeBinary, nullable=False)
+    e = Column(LargeBinary, nullable=False)
 
 
 class VotingServerModel(Base):
     __tablename__ = "voting_servers"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(String, primary_key=True)
     server_name = Column(String, nullable=False)
     number_of_candidates = Column(Integer, nullable=False)
     maximum_number_of_voters = Column(Integer, nullable=False)
-    public_key = Column(String, nullable=False)
\ No newline at end of file
+    precomputation_window = Column(Integer, nullable=False)
+    a = Column(LargeBinary, nullable=False)
+    b = Column(LargeBinary, nullable=False)
+    p = Column(LargeBinary, nullable=False)
+    order = Column(LargeBinary, nullable=False)
+    # x and y of the base point P.
+    base_point = Column(LargeBinary, nullable=False)
+    private_key = Column(LargeBinary, nullable=False)
+
+
+class BallotModel(Base):
+    __tablename__ = "ballots"
+
+    server_id = Column(String, ForeignKey("voting_servers.id"), primary_key=True)
+    # Position of the ballot in the server's acceptance order.
+    seq = Column(Integer, primary_key=True, autoincrement=False)
+    # Column records of entity.ballot_store.BallotStore.
+    vote = Column(LargeBinary, nullable=False)
+    public_key = Column(LargeBinary, nullable=False)
+    signed_message = Column(LargeBinary, nullable=False)
+    proof_of_work = Column(LargeBinary, nullable=False)
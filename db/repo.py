@@ -1,38 +1,132 @@
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session
-from models import UserModel, VotingServerModel
+from db.models import UserModel, VotingServerModel, BallotModel
+from entity.ballot_store import BallotRecord, EXPONENT_BYTES
+from entity.ecc_point import ECCPoint
+from entity.user import User
+from entity.voting_server import VotingServer
+from utils.math import RSA_PRIME_BITS
+from typing import Dict, Iterator, List, Tuple
+
+RSA_PRIME_BYTES = RSA_PRIME_BITS // 8
+
+# Rows fetched per round trip when replaying the ballot log.
+BALLOT_FETCH_SIZE = 1000
+
+
+def _from_bytes(value: bytes) -> int:
+    return int.from_bytes(value, "big")
+
 
 class UserRepository:
+    """Users are written in bulk; the caller commits."""
+
     def __init__(self, db: Session):
         self.db = db
 
-    def create_user(self, user_name: str, public_key: dict):
-        user = UserModel(
-            user_name=user_name,
-            public_key=public_key
-        )
-        self.db.add(user)
-        self.db.commit()
-        self.db.refresh(user)
-        return user
+    @staticmethod
+    def to_row(user_id: str, user: User) -> Dict:
+        p, q, e = user.get_rsa_key()
+        return {
+            "id": user_id,
+            "user_name": user.user_name,
+            "p": p.to_bytes(RSA_PRIME_BYTES, "big"),
+            "q": q.to_bytes(RSA_PRIME_BYTES, "big"),
+            "e": e.to_bytes(EXPONENT_BYTES, "big"),
+        }
+
+    def create_users(self, rows: List[Dict]):
+        self.db.execute(insert(UserModel), rows)
+
+    def load_users(self) -> Dict[str, User]:
+        return {
+            model.id: User(model.user_name, rsa_key=(_from_bytes(model.p), _from_bytes(model.q), _from_bytes(model.e)))
+            for model in self.db.scalars(select(UserModel))
+        }
 
-    def get_user_by_id(self, user_id: int):
-        return self.db.query(UserModel).filter(UserModel.id == user_id).first()
 
 class VotingServerRepository:
+    """Voting servers, including their private keys; the caller commits."""
+
     def __init__(self, db: Session):
         self.db = db
 
-    def create_voting_server(self, server_name: str, number_of_candidates: int, maximum_number_of_voters: int, public_key: dict):
-        server = VotingServerModel(
-            server_name=server_name,
-            number_of_candidates=number_of_candidates,
-            maximum_number_of_voters=maximum_number_of_voters,
-            public_key=public_key
-        )
-        self.db.add(server)
-        self.db.commit()
-        self.db.refresh(server)
-        return server
+    @staticmethod
+    def to_row(server_id: str, server_name: str, server: VotingServer) -> Dict:
+        curve = server.elliptic_curve
+        width = (max(curve.p, server.order).bit_length() + 7) // 8
+        return {
+            "id": server_id,
+            "server_name": server_name,
+            "number_of_candidates": server.number_of_candidate,
+            "maximum_number_of_voters": server.maximum_number_of_voters,
+            "precomputation_window": server.precomputation_window,
+            "a": curve.a.to_bytes(width, "big"),
+            "b": curve.b.to_bytes(width, "big"),
+            "p": curve.p.to_bytes(width, "big"),
+            "order": server.order.to_bytes(width, "big"),
+            "base_point": server.P.x.to_bytes(width, "big") + server.P.y.to_bytes(width, "big"),
+            "private_key": server._d.to_bytes(width, "big"),
+        }
 
-    def get_voting_server_by_id(self, server_id: int):
-        return self.db.query(VotingServerModel).filter(VotingServerModel.id == server_id).first()
\ No newline at end of file
+    def create_voting_server(self, server_id: str, server_name: str, server: VotingServer):
+        self.db.execute(insert(VotingServerModel), [self.to_row(server_id, server_name, server)])
+
+    def load_voting_server_parameters(self) -> List[Tuple[str, Dict]]:
+        """Return (server id, VotingServer keyword arguments) for every stored server."""
+        servers = []
+        for model in self.db.scalars(select(VotingServerModel)):
+            width = len(model.p)
+            servers.append((model.id, {
+                "_number_of_candidate": model.number_of_candidates,
+                "maximum_number_of_voter": model.maximum_number_of_voters,
+                "value_a": _from_bytes(model.a),
+                "value_b": _from_bytes(model.b),
+                "value_p": _from_bytes(model.p),
+                "value_order": _from_bytes(model.order),
+                "precomputation_window": model.precomputation_window,
+                "private_key": _from_bytes(model.private_key),
+                "base_point": ECCPoint(_from_bytes(model.base_point[:width]), _from_bytes(model.base_point[width:])),
+            }))
+        return servers
+
+
+class BallotRepository:
+    """Accepted ballots as an append-only log of BallotStore records; the caller commits."""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def to_row(server_id: str, seq: int, records: BallotRecord) -> Dict:
+        vote, public_key, signed_message, proof_of_work = records
+        return {
+            "server_id": server_id,
+            "seq": seq,
+            "vote": vote,
+            "public_key": public_key,
+            "signed_message": signed_message,
+            "proof_of_work": proof_of_work,
+        }
+
+    def append_ballots(self, rows: List[Dict]):
+        self.db.execute(insert(BallotModel), rows)
+
+    def count_ballots(self, server_id: str) -> int:
+        return self.db.scalar(select(func.count()).select_from(BallotModel).where(BallotModel.server_id == server_id))
+
+    def iter_ballots(self, server_id: str, start: int = 0) -> Iterator[BallotRecord]:
+        """Yield the server's ballot records from `start` on in acceptance order, stopping at the first gap."""
+        statement = (
+            select(BallotModel.seq, BallotModel.vote, BallotModel.public_key, BallotModel.signed_message, BallotModel.proof_of_work)
+            .where(BallotModel.server_id == server_id, BallotModel.seq >= start)
+            .order_by(BallotModel.seq)
+            .execution_options(yield_per=BALLOT_FETCH_SIZE)
+        )
+        expected = start
+        for seq, vote, public_key, signed_message, proof_of_work in self.db.execute(statement):
+            # A failed batch stops the group-commit writer, so no ballot after a gap was ever acknowledged.
+            if seq != expected:
+                return
+            yield bytes(vote), bytes(public_key), bytes(signed_message), bytes(proof_of_work)
+            expected += 1
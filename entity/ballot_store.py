@@ -0,0 +1,242 @@
+from entity.ecc_point import ECCPoint
+from entity.types import IntPair, EccPointPair, ProofOfWork
+from utils.math import RSA_PRIME_BITS
+from typing import Iterator, List, Optional, Tuple, Union
+
+# Records per preallocated chunk. Chunks are never resized, so memoryviews handed out by
+# FixedWidthColumn.buffers stay valid while more ballots are appended.
+CHUNK_RECORDS = 4096
+
+# Width of an RSA modulus or signature, and of the public exponent.
+RSA_BYTES = 2 * RSA_PRIME_BITS // 8
+EXPONENT_BYTES = 8
+
+Ballot = Tuple[EccPointPair, IntPair, int, ProofOfWork]
+# Encoded (vote, public key, signed message, proof) columns of one ballot.
+BallotRecord = Tuple[bytes, bytes, bytes, bytes]
+
+
+class FixedWidthColumn:
+    """Column of fixed-width byte records, appended to and only truncated to undo appends."""
+
+    __slots__ = ("width", "chunk_records", "_chunks", "_length")
+
+    def __init__(self, width: int, chunk_records: int = CHUNK_RECORDS):
+        self.width = width
+        self.chunk_records = chunk_records
+        # Appends only ever write into the last chunk, which is always a bytearray.
+        self._chunks: List[Union[bytearray, memoryview]] = []
+        self._length = 0
+
+    @classmethod
+    def from_buffer(cls, width: int, buffer: memoryview, count: int, chunk_records: int = CHUNK_RECORDS) -> "FixedWidthColumn":
+        """
+        Wrap `count` records laid out back to back in `buffer`, e.g. a memory-mapped snapshot.
+        Full chunks are used in place; only the trailing partial chunk is copied so it can grow.
+        """
+        if len(buffer) != count * width:
+            raise ValueError("Column buffer does not match the record count.")
+        column = cls(width, chunk_records)
+        chunk_bytes = width * chunk_records
+        full_chunks, remainder = divmod(count, chunk_records)
+        column._chunks = [buffer[i * chunk_bytes:(i + 1) * chunk_bytes].toreadonly() for i in range(full_chunks)]
+        if remainder:
+            chunk = bytearray(chunk_bytes)
+            chunk[:remainder * width] = buffer[full_chunks * chunk_bytes:]
+            column._chunks.append(chunk)
+        column._length = count
+        return column
+
+    def __len__(self) -> int:
+        return self._length
+
+    def append(self, record: bytes):
+        """Append one record of exactly `width` bytes."""
+        if len(record) != self.width:
+            raise ValueError(f"Expected a {self.width}-byte record, got {len(record)} bytes.")
+        chunk_index, position = divmod(self._length, self.chunk_records)
+        if chunk_index == len(self._chunks):
+            self._chunks.append(bytearray(self.width * self.chunk_records))
+        offset = position * self.width
+        self._chunks[chunk_index][offset:offset + self.width] = record
+        self._length += 1
+
+    def truncate(self, length: int):
+        """Drop every record from `length` on."""
+        if not 0 <= length <= self._length:
+            raise ValueError("Truncation length out of range.")
+        del self._chunks[-(-length // self.chunk_records):]
+        if length % self.chunk_records and not isinstance(self._chunks[-1], bytearray):
+            # The next append writes into this chunk, so a mapped one is copied.
+            self._chunks[-1] = bytearray(self._chunks[-1])
+        self._length = length
+
+    def record(self, index: int) -> memoryview:
+        """Return a read-only view of one record."""
+        if not 0 <= index < self._length:
+            raise IndexError("Record index out of range.")
+        chunk_index, position = divmod(index, self.chunk_records)
+        offset = position * self.width
+        return memoryview(self._chunks[chunk_index])[offset:offset + self.width].toreadonly()
+
+    def buffers(self, start: int = 0, stop: Optional[int] = None) -> Iterator[memoryview]:
+        """Yield read-only views covering records [start, stop), one per chunk, without copying."""
+        stop = self._length if stop is None else min(stop, self._length)
+        while start < stop:
+            chunk_index, position = divmod(start, self.chunk_records)
+            count = min(stop - start, self.chunk_records - position)
+            offset = position * self.width
+            yield memoryview(self._chunks[chunk_index])[offset:offset + count * self.width].toreadonly()
+            start += count
+
+    def nbytes(self) -> int:
+        """Return the number of bytes allocated for the column."""
+        return len(self._chunks) * self.width * self.chunk_records
+
+
+class BallotStore:
+    """
+    Columnar storage of accepted ballots. Points are kept uncompressed as fixed-width x and y
+    (all 0xff bytes for the point at infinity) so records decode without square roots, and
+    proof scalars are kept modulo the group order.
+    """
+
+    def __init__(self, value_p: int, value_order: int):
+        self.order = value_order
+        self.coordinate_bytes = (value_p.bit_length() + 7) // 8
+        self.scalar_bytes = (value_order.bit_length() + 7) // 8
+        self.point_bytes = 2 * self.coordinate_bytes
+        self._infinity = b"\xff" * self.point_bytes
+        self.number_of_candidate: Optional[int] = None
+        self.votes = FixedWidthColumn(2 * self.point_bytes)
+        self.public_keys = FixedWidthColumn(RSA_BYTES + EXPONENT_BYTES)
+        self.signed_messages = FixedWidthColumn(RSA_BYTES)
+        self.proofs: Optional[FixedWidthColumn] = None
+
+    @classmethod
+    def from_buffers(
+        cls, value_p: int, value_order: int, number_of_candidate: int, count: int,
+        votes: memoryview, public_keys: memoryview, signed_messages: memoryview, proofs: memoryview
+    ) -> "BallotStore":
+        """Rebuild a store around column buffers saved back to back, without copying full chunks."""
+        store = cls(value_p, value_order)
+        store.number_of_candidate = number_of_candidate
+        store.votes = FixedWidthColumn.from_buffer(store.votes.width, votes, count)
+        store.public_keys = FixedWidthColumn.from_buffer(store.public_keys.width, public_keys, count)
+        store.signed_messages = FixedWidthColumn.from_buffer(store.signed_messages.width, signed_messages, count)
+        store.proofs = FixedWidthColumn.from_buffer(store.proof_width(number_of_candidate), proofs, count)
+        return store
+
+    def proof_width(self, number_of_candidate: int) -> int:
+        """Return the proof record width for `number_of_candidate` candidates."""
+        return 2 * number_of_candidate * (self.point_bytes + self.scalar_bytes)
+
+    def __len__(self) -> int:
+        # The proof column is appended last, so every ballot it counts is complete.
+        return len(self.proofs) if self.proofs is not None else 0
+
+    def append(
+        self, vote: EccPointPair, public_key: IntPair, signed_message: int, proof_of_work: ProofOfWork
+    ) -> BallotRecord:
+        """
+        Append a ballot and return its column records. Every ballot of a store must have the
+        same number of candidates.
+        """
+        # Encode every field before appending any, so a bad ballot leaves the columns aligned.
+        records = (
+            self._encode_point(vote.first) + self._encode_point(vote.second),
+            public_key.x.to_bytes(RSA_BYTES, "big") + public_key.y.to_bytes(EXPONENT_BYTES, "big"),
+            signed_message.to_bytes(RSA_BYTES, "big"),
+            b"".join(
+                [self._encode_point(point) for point in proof_of_work.A + proof_of_work.B] +
+                [(value % self.order).to_bytes(self.scalar_bytes, "big") for value in proof_of_work.u + proof_of_work.w]
+            ),
+        )
+        self.append_records(records)
+        return records
+
+    def append_records(self, records: BallotRecord):
+        """Append a ballot given as column records, e.g. as returned by `append` or `records`."""
+        vote_record, public_key_record, signed_message_record, proof_record = records
+        if self.proofs is None:
+            k, remainder = divmod(len(proof_record), self.proof_width(1))
+            if remainder or not k:
+                raise ValueError("Invalid proof of work dimensions.")
+            self.number_of_candidate = k
+            self.proofs = FixedWidthColumn(len(proof_record))
+        if (
+            len(vote_record) != self.votes.width or len(public_key_record) != self.public_keys.width or
+            len(signed_message_record) != self.signed_messages.width or len(proof_record) != self.proofs.width
+        ):
+            raise ValueError("Ballot record does not match the column widths.")
+
+        self.votes.append(vote_record)
+        self.public_keys.append(public_key_record)
+        self.signed_messages.append(signed_message_record)
+        self.proofs.append(proof_record)
+
+    def truncate(self, count: int):
+        """Drop every ballot from index `count` on, e.g. ballots whose log write failed."""
+        if self.proofs is None:
+            if count:
+                raise ValueError("Truncation length out of range.")
+            return
+        # The proof column goes first, so `len` never counts a partially removed ballot.
+        self.proofs.truncate(count)
+        self.signed_messages.truncate(count)
+        self.public_keys.truncate(count)
+        self.votes.truncate(count)
+
+    def records(self, index: int) -> BallotRecord:
+        """Return copies of the column records of the ballot at `index`."""
+        return (
+            bytes(self.votes.record(index)), bytes(self.public_keys.record(index)),
+            bytes(self.signed_messages.record(index)), bytes(self.proofs.record(index))
+        )
+
+    def vote(self, index: int) -> EccPointPair:
+        """Decode the ciphertext of the ballot at `index`."""
+        record = self.votes.record(index)
+        return EccPointPair(self._decode_point(record[:self.point_bytes]), self._decode_point(record[self.point_bytes:]))
+
+    def public_key(self, index: int) -> IntPair:
+        """Decode the voter public key of the ballot at `index`."""
+        record = self.public_keys.record(index)
+        return IntPair(int.from_bytes(record[:RSA_BYTES], "big"), int.from_bytes(record[RSA_BYTES:], "big"))
+
+    def signed_message(self, index: int) -> int:
+        """Decode the signature of the ballot at `index`."""
+        return int.from_bytes(self.signed_messages.record(index), "big")
+
+    def proof_of_work(self, index: int) -> ProofOfWork:
+        """Decode the proof of the ballot at `index`."""
+        record = self.proofs.record(index)
+        k, point_bytes, scalar_bytes = self.number_of_candidate, self.point_bytes, self.scalar_bytes
+        points = [self._decode_point(record[i * point_bytes:(i + 1) * point_bytes]) for i in range(2 * k)]
+        offset = 2 * k * point_bytes
+        scalars = [
+            int.from_bytes(record[offset + i * scalar_bytes:offset + (i + 1) * scalar_bytes], "big")
+            for i in range(2 * k)
+        ]
+        return ProofOfWork(points[:k], points[k:], scalars[:k], scalars[k:])
+
+    def ballot(self, index: int) -> Ballot:
+        """Decode the (vote, public key, signed message, proof) ballot at `index`."""
+        return self.vote(index), self.public_key(index), self.signed_message(index), self.proof_of_work(index)
+
+    def nbytes(self) -> int:
+        """Return the number of bytes allocated for ballot records."""
+        columns = [self.votes, self.public_keys, self.signed_messages] + ([self.proofs] if self.proofs is not None else [])
+        return sum(column.nbytes() for column in columns)
+
+    def _encode_point(self, point: ECCPoint) -> bytes:
+        if point.is_origin:
+            return self._infinity
+        return point.x.to_bytes(self.coordinate_bytes, "big") + point.y.to_bytes(self.coordinate_bytes, "big")
+
+    def _decode_point(self, record: memoryview) -> ECCPoint:
+        if record == self._infinity:
+            return ECCPoint(0, 0, True)
+        return ECCPoint(
+            int.from_bytes(record[:self.coordinate_bytes], "big"), int.from_bytes(record[self.coordinate_bytes:], "big")
+        )
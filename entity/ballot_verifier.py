@@ -0,0 +1,116 @@
+from entity.elliptic_curve import EllipticCurve, ECCPoint
+from entity.types import EccPointPair, ProofOfWork
+from entity.fixed_base_table import ElectionPrecomputation, BallotTables
+from entity.election_parameters import ElectionParameters
+from utils.math import hash_array_of_points
+from utils import metrics
+from Crypto.Util.number import getRandomNBitInteger
+from typing import List, Tuple
+
+# Bit length of the random weights used to combine proof equations in batch verification.
+BATCH_WEIGHT_BITS = 128
+
+
+class BallotVerifier:
+    """Proof checks for one election, shared by the voting server and its verification workers."""
+
+    def __init__(self, elliptic_curve: EllipticCurve, order: int, M: List[ECCPoint], precomputation: ElectionPrecomputation):
+        self.elliptic_curve = elliptic_curve
+        self.order = order
+        self.M = M
+        self.number_of_candidate = len(M)
+        self.precomputation = precomputation
+
+    @classmethod
+    def from_parameters(cls, parameters: ElectionParameters) -> "BallotVerifier":
+        """Build a verifier from the public election parameters, sharing their fixed-base tables."""
+        return cls(parameters.elliptic_curve, parameters.order, list(parameters.M), parameters.precomputation)
+
+    def validate_ballot_points(self, encrypted_message: EccPointPair, proof_of_work: ProofOfWork):
+        """Check once that every point of an incoming ballot lies on the curve."""
+        validate_point = self.elliptic_curve.validate_point
+        validate_point(encrypted_message.first)
+        validate_point(encrypted_message.second)
+        for point in proof_of_work.A:
+            validate_point(point)
+        for point in proof_of_work.B:
+            validate_point(point)
+
+    def verify_vote(self, encrypted_message: EccPointPair, proof_of_work: ProofOfWork) -> bool:
+        """Verify the validity of a vote."""
+        A, B, u, w = proof_of_work.A, proof_of_work.B, proof_of_work.u, proof_of_work.w
+        table_P, table_Q = self.precomputation.P, self.precomputation.Q
+
+        if not self.verify_proof_challenge(proof_of_work):
+            return False
+
+        elliptic_curve = self.elliptic_curve
+        tables = BallotTables(elliptic_curve, encrypted_message, self.M)
+        expected = [
+            elliptic_curve._multi_multiply_jacobian([w[i], u[i]], [table_P, tables.Ap])
+            for i in range(self.number_of_candidate)
+        ] + [
+            elliptic_curve._multi_multiply_jacobian([w[i], u[i]], [table_Q, tables.shifted(i)])
+            for i in range(self.number_of_candidate)
+        ]
+        # All 2k recomputed commitments share one inversion.
+        return elliptic_curve.batch_normalize(expected) == list(A) + list(B)
+
+    def verify_proof_challenge(self, proof_of_work: ProofOfWork) -> bool:
+        """Check the proof dimensions and that the challenges sum to the hash of the commitments modulo the order."""
+        A, B, u, w = proof_of_work.A, proof_of_work.B, proof_of_work.u, proof_of_work.w
+        if not all(len(lst) == self.number_of_candidate for lst in [A, B, u, w]):
+            raise ValueError("Invalid proof of work dimensions.")
+
+        challenge = hash_array_of_points(A + B, self.elliptic_curve.p)
+        return (challenge - sum(u)) % self.order == 0
+
+    def verify_votes_together(self, ballots: List[Tuple[EccPointPair, ProofOfWork]]) -> bool:
+        """
+        Check the proof equations of many ballots at once. Every equation is weighted by a
+        random coefficient and the weighted sum is evaluated as one multi-scalar multiplication,
+        which is the point at infinity for valid ballots and, with overwhelming probability,
+        not the point at infinity if any equation fails.
+        """
+        order = self.order
+        precomputation = self.precomputation
+        scalar_P, scalar_Q = 0, 0
+        scalar_M = [0] * self.number_of_candidate
+        scalars, points = [], []
+
+        for encrypted_message, proof_of_work in ballots:
+            A, B, u, w = proof_of_work.A, proof_of_work.B, proof_of_work.u, proof_of_work.w
+            scalar_Ap, scalar_Bp = 0, 0
+            for i in range(self.number_of_candidate):
+                alpha = getRandomNBitInteger(BATCH_WEIGHT_BITS)
+                beta = getRandomNBitInteger(BATCH_WEIGHT_BITS)
+                # alpha * (w P + u Ap - A) + beta * (w Q + u (Bp - M) - B)
+                scalar_P += alpha * w[i]
+                scalar_Q += beta * w[i]
+                scalar_Ap += alpha * u[i]
+                scalar_Bp += beta * u[i]
+                scalar_M[i] -= beta * u[i]
+                scalars += [-alpha, -beta]
+                points += [A[i], B[i]]
+            scalars += [scalar_Ap % order, scalar_Bp % order]
+            points += [encrypted_message.first, encrypted_message.second]
+
+        scalars += [scalar_P % order, scalar_Q % order] + [value % order for value in scalar_M]
+        points += [precomputation.P, precomputation.Q] + precomputation.M
+        _, _, Z = self.elliptic_curve._multi_multiply_jacobian(scalars, points)
+        return Z == 0
+
+    def find_valid_votes(self, ballots: List[Tuple[EccPointPair, ProofOfWork]], indexes: List[int]) -> List[int]:
+        """Return the indexes whose proofs verify, bisecting whenever a combined check fails."""
+        if not indexes:
+            return []
+        if len(indexes) == 1:
+            return indexes if self.verify_vote(*ballots[indexes[0]]) else []
+        if self.verify_votes_together([ballots[i] for i in indexes]):
+            return indexes
+        mid = len(indexes) // 2
+        return self.find_valid_votes(ballots, indexes[:mid]) + self.find_valid_votes(ballots, indexes[mid:])
+
+
+metrics.register_timer(BallotVerifier, "verify_vote", "proof_verification")
+metrics.register_timer(BallotVerifier, "find_valid_votes", "batch_proof_verification")
@@ -1,4 +1,6 @@
 class ECCPoint:
+    __slots__ = ("_x", "_y", "_origin")
+
     def __init__(self, x: int, y: int, origin: bool = False):
         self._x = x
         self._y = y
@@ -29,4 +31,8 @@ class ECCPoint:
     def __repr__(self) -> str:
         if self.is_origin:
             return "ECC Point (Origin)"
-        return f"ECC Point ({self.x}, {self.y})"
\ No newline at end of file
+        return f"ECC Point ({self.x}, {self.y})"
+
+    def to_dict(self) -> dict:
+        """Return the point as plain JSON-compatible values, keyed like its attributes."""
+        return {"_x": self._x, "_y": self._y, "_origin": self._origin}
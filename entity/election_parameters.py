@@ -0,0 +1,137 @@
+from entity.elliptic_curve import EllipticCurve, ECCPoint
+from entity.fixed_base_table import FixedBaseTable, ElectionPrecomputation, DEFAULT_WINDOW
+from utils.ecc import square_root
+from utils.field import FIELD
+from typing import Optional, Sequence, Tuple
+import threading
+import weakref
+
+
+class _Interned:
+    """
+    Immutable value objects with one live instance per distinct key, so equal parameters are
+    shared (and their cached values computed once) across servers, requests and unpickling.
+    """
+
+    __slots__ = ("_key", "_hash", "__weakref__")
+    _instances: "weakref.WeakValueDictionary"
+    _intern_lock = threading.Lock()
+
+    @classmethod
+    def _intern(cls, key: Tuple):
+        with cls._intern_lock:
+            instance = cls._instances.get(key)
+            if instance is None:
+                instance = object.__new__(cls)
+                object.__setattr__(instance, "_key", key)
+                object.__setattr__(instance, "_hash", hash(key))
+                instance._init()
+                cls._instances[key] = instance
+            return instance
+
+    def _init(self):
+        pass
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is immutable.")
+
+    def __eq__(self, other: object) -> bool:
+        return self is other or (type(other) is type(self) and self._key == other._key)
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __reduce__(self):
+        # Rebuild from the key only; cached values are recomputed (once) by the receiver.
+        return type(self), self._key
+
+
+class CurveParameters(_Interned):
+    """Curve coefficients, group order and the values derived from them."""
+
+    __slots__ = ("a", "b", "p", "order", "elliptic_curve", "coordinate_bytes", "scalar_bytes", "sqrt_exponent")
+    _instances = weakref.WeakValueDictionary()
+
+    def __new__(cls, a: int, b: int, p: int, order: int) -> "CurveParameters":
+        return cls._intern((a % p, b % p, p, order))
+
+    def _init(self):
+        a, b, p, order = self._key
+        for name, value in (
+            ("a", a), ("b", b), ("p", p), ("order", order),
+            ("elliptic_curve", EllipticCurve(a=a, b=b, p=p)),
+            ("coordinate_bytes", (p.bit_length() + 7) // 8),
+            ("scalar_bytes", (order.bit_length() + 7) // 8),
+            # For p = 3 (mod 4) a square root is a single exponentiation by (p + 1) / 4.
+            ("sqrt_exponent", (p + 1) // 4 if p % 4 == 3 else None),
+        ):
+            object.__setattr__(self, name, value)
+
+    def square_root(self, value: int) -> int:
+        """Return a square root of `value` modulo p (callers check that it squares back)."""
+        if self.sqrt_exponent is not None:
+            return int(FIELD.pow(value, self.sqrt_exponent, self.p))
+        return square_root(value, self.p)
+
+    def __repr__(self) -> str:
+        return f"CurveParameters(p={self.p}, order={self.order})"
+
+
+class ElectionParameters(_Interned):
+    """
+    Public parameters of an election: curve, generator P, public key Q, candidate points M,
+    table window and voter limit. The fixed-base tables are built on first use and shared.
+    """
+
+    __slots__ = (
+        "curve", "P", "Q", "M", "window", "maximum_number_of_voters", "_precomputation", "_precomputation_lock"
+    )
+    _instances = weakref.WeakValueDictionary()
+
+    def __new__(
+        cls, curve: CurveParameters, P: ECCPoint, Q: ECCPoint, M: Sequence[ECCPoint],
+        window: int = DEFAULT_WINDOW, maximum_number_of_voters: int = 0,
+        precomputation: Optional[ElectionPrecomputation] = None
+    ) -> "ElectionParameters":
+        parameters = cls._intern((curve, P, Q, tuple(M), window, maximum_number_of_voters))
+        if precomputation is not None:
+            # Adopt tables the caller already built, unless some are cached already.
+            with parameters._precomputation_lock:
+                if parameters._precomputation is None:
+                    object.__setattr__(parameters, "_precomputation", precomputation)
+        return parameters
+
+    def _init(self):
+        curve, P, Q, M, window, maximum_number_of_voters = self._key
+        for name, value in (
+            ("curve", curve), ("P", P), ("Q", Q), ("M", M), ("window", window),
+            ("maximum_number_of_voters", maximum_number_of_voters),
+            ("_precomputation", None), ("_precomputation_lock", threading.Lock()),
+        ):
+            object.__setattr__(self, name, value)
+
+    @property
+    def elliptic_curve(self) -> EllipticCurve:
+        return self.curve.elliptic_curve
+
+    @property
+    def order(self) -> int:
+        return self.curve.order
+
+    @property
+    def precomputation(self) -> ElectionPrecomputation:
+        """Return the fixed-base tables for P, Q and M, building them on first use."""
+        if self._precomputation is None:
+            with self._precomputation_lock:
+                if self._precomputation is None:
+                    curve, order, window = self.elliptic_curve, self.order, self.window
+                    object.__setattr__(self, "_precomputation", ElectionPrecomputation(
+                        FixedBaseTable(curve, self.P, order, window), self.Q, list(self.M)
+                    ))
+        return self._precomputation
+
+    def __repr__(self) -> str:
+        return f"ElectionParameters(k={len(self.M)}, window={self.window}, {self.curve!r})"
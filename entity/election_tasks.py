@@ -0,0 +1,76 @@
+# CPU-bound election work that can run in worker processes. Each task receives the election's
+# public parameters (see VotingServer.public_parameters); they pickle without their tables, which
+# each worker builds at most once.
+from entity.elliptic_curve import ECCPoint
+from entity.election_parameters import ElectionParameters
+from entity.ballot_verifier import BallotVerifier
+from entity.tally_solver import TallySolver
+from entity.types import EccPointPair, ProofOfWork
+from entity.user import User
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# Number of elections whose tables a worker keeps.
+ELECTION_CACHE_SIZE = 8
+
+
+@lru_cache(maxsize=ELECTION_CACHE_SIZE)
+def _election(parameters: ElectionParameters) -> Tuple[BallotVerifier, TallySolver]:
+    """
+    Build the verifier and tally solver of an election. The cache also holds the parameters
+    themselves, which are otherwise only weakly referenced once unpickled.
+    """
+    M = list(parameters.M)
+    verifier = BallotVerifier(parameters.elliptic_curve, parameters.order, M, parameters.precomputation)
+    tally_solver = TallySolver(parameters.elliptic_curve, parameters.precomputation, M, parameters.maximum_number_of_voters)
+    return verifier, tally_solver
+
+
+def create_user(user_name: str) -> User:
+    """Create a user, generating its RSA key."""
+    return User(user_name)
+
+
+def vote(user: User, candidate: int, parameters: ElectionParameters) -> Tuple[EccPointPair, int, object, ProofOfWork]:
+    """Encrypt, sign and prove a vote."""
+    # Keeps the unpickled parameters, and so their tables, alive between tasks.
+    _election(parameters)
+    return user.vote(candidate, parameters)
+
+
+def verify_vote(parameters: ElectionParameters, encrypted_message: EccPointPair, proof_of_work: ProofOfWork) -> bool:
+    """Verify one ballot's proof."""
+    verifier, _ = _election(parameters)
+    return verifier.verify_vote(encrypted_message, proof_of_work)
+
+
+def vote_many(ballots: List[Tuple[User, int]], parameters: ElectionParameters) -> List[Tuple]:
+    """Encrypt, sign and prove several votes. Each entry is the vote, or None and the reason it failed."""
+    _election(parameters)
+    results = []
+    for user, candidate in ballots:
+        try:
+            results.append((user.vote(candidate, parameters), None))
+        except ValueError as e:
+            results.append((None, str(e)))
+    return results
+
+
+def find_valid_votes(parameters: ElectionParameters, ballots: List[Tuple[EccPointPair, ProofOfWork]], indexes: List[int]) -> List[int]:
+    """Batch-verify the ballots at `indexes` and return the indexes of those whose proofs hold."""
+    verifier, _ = _election(parameters)
+    return verifier.find_valid_votes(ballots, indexes)
+
+
+def write_tally_table(parameters: ElectionParameters, path: str):
+    """Build and write the baby-step table of an election."""
+    _, tally_solver = _election(parameters)
+    tally_solver.write_table(path)
+
+
+def solve_tally(parameters: ElectionParameters, decrypted_S: ECCPoint, n: int, table_path: Optional[str] = None) -> List[int]:
+    """Recover the per-candidate counts from a decrypted aggregate."""
+    _, tally_solver = _election(parameters)
+    if table_path is not None and tally_solver.table_path != table_path:
+        tally_solver.load_table(table_path)
+    return tally_solver.solve(decrypted_S, n)
@@ -1,12 +1,64 @@
-from Crypto.Util.number import inverse, getRandomRange
+from Crypto.Util.number import getRandomRange
 from utils.ecc import legendre_symbol, square_root
+from utils.field import FIELD
 from entity.ecc_point import ECCPoint
+from utils import metrics
+from typing import Tuple, Optional, List, Sequence, Union, Any
+import os
+
+# Jacobian point (X, Y, Z) representing the affine point (X / Z^2, Y / Z^3).
+# The point at infinity is any triple with Z == 0.
+JacobianPoint = Tuple[int, int, int]
+
+JACOBIAN_INFINITY: JacobianPoint = (1, 1, 0)
+
+# Batches of at least this many variable-base terms use Pippenger's bucket method
+# in multi_multiply; smaller batches use interleaved width-w NAFs (Straus / Shamir's trick).
+PIPPENGER_THRESHOLD = 32
+# NAF width for variable-base multiplication: 2^(w-2) odd multiples are precomputed and on
+# average one in w+1 digits is non-zero.
+WNAF_WIDTH = 5
+# Points consumed one at a time by a search that may stop early are normalized in chunks of this
+# size, so one inversion is shared by the chunk and at most one chunk is computed in vain.
+NORMALIZE_BATCH = 256
+
+
+def _wnaf(value: int, width: int) -> List[int]:
+    """Return the width-w NAF digits of `value`, least significant first."""
+    sign = -1 if value < 0 else 1
+    value = abs(value)
+    window, half = 1 << width, 1 << (width - 1)
+    digits = []
+    while value:
+        digit = 0
+        if value & 1:
+            digit = value & (window - 1)
+            if digit >= half:
+                digit -= window
+            value -= digit
+        digits.append(sign * digit)
+        value >>= 1
+    return digits
+
+
+def _strict_from_env() -> bool:
+    """Read the strict validation flag from the ECC_STRICT environment variable."""
+    return os.environ.get("ECC_STRICT", "").lower() in ("1", "true", "yes")
+
 
 class EllipticCurve:
-    def __init__(self, a: int, b: int, p: int):
+    def __init__(self, a: int, b: int, p: int, strict: Optional[bool] = None):
         self.a = a % p
         self.b = b % p
         self.p = p
+        # Field backend, and p and a converted for it once, for the Jacobian formulas.
+        self.field = FIELD
+        self._p = FIELD.number(p)
+        self._a = FIELD.number(self.a)
+        # Points are validated once at trust boundaries (see validate_point). In strict
+        # mode every operand and result is re-checked, which is slow but catches
+        # arithmetic bugs.
+        self.strict = _strict_from_env() if strict is None else strict
 
         if (4 * self.a ** 3 + 27 * self.b ** 2) % self.p == 0:
             raise ValueError("Invalid curve parameters: 4a^3 + 27b^2 must not be congruent to 0 mod p.")
@@ -18,6 +70,16 @@ class EllipticCurve:
         x, y = point.x, point.y
         return (y ** 2 - x ** 3 - self.a * x - self.b) % self.p == 0
 
+    def validate_point(self, point: ECCPoint) -> ECCPoint:
+        """Check a point coming from an untrusted source and return it unchanged."""
+        if not isinstance(point, ECCPoint):
+            raise ValueError("Expected an ECC point.")
+        if not point.is_origin and not (0 <= point.x < self.p and 0 <= point.y < self.p):
+            raise ValueError("Point coordinates are out of range.")
+        if not self.is_on_curve(point):
+            raise ValueError("The point is not on the curve.")
+        return point
+
     def negation_point(self, point: ECCPoint) -> ECCPoint:
         """Return the negation of a point."""
         if point.is_origin:
@@ -26,7 +88,7 @@ class EllipticCurve:
 
     def add(self, point_1: ECCPoint, point_2: ECCPoint) -> ECCPoint:
         """Add two points on the curve."""
-        if not self.is_on_curve(point_1) or not self.is_on_curve(point_2):
+        if self.strict and (not self.is_on_curve(point_1) or not self.is_on_curve(point_2)):
             raise ValueError("One or both points are not on the curve.")
 
         if point_1.is_origin:
@@ -38,15 +100,15 @@ class EllipticCurve:
 
         if point_1 != point_2:
             numerator = (point_2.y - point_1.y) % self.p
-            denominator = inverse((point_2.x - point_1.x) % self.p, self.p)
+            denominator = self.field.inverse((point_2.x - point_1.x) % self.p, self.p)
         else:
             numerator = (3 * point_1.x ** 2 + self.a) % self.p
-            denominator = inverse((2 * point_1.y) % self.p, self.p)
+            denominator = self.field.inverse((2 * point_1.y) % self.p, self.p)
 
         L = (numerator * denominator) % self.p
         x3 = (L ** 2 - point_1.x - point_2.x) % self.p
         y3 = (L * (point_1.x - x3) - point_1.y) % self.p
-        return ECCPoint(x3, y3)
+        return ECCPoint(int(x3), int(y3))
 
     def sub(self, point_1: ECCPoint, point_2: ECCPoint) -> ECCPoint:
         """Subtract two points on the curve."""
@@ -54,21 +116,220 @@ class EllipticCurve:
 
     def multiply(self, value: int, point: ECCPoint) -> ECCPoint:
         """Multiply a point by a scalar."""
-        if not self.is_on_curve(point):
+        if self.strict and not self.is_on_curve(point):
             raise ValueError("The point is not on the curve.")
-        if value < 0:
-            value = -value
-            point = self.negation_point(point)
-
-        result = ECCPoint(0, 0, True)
-        temp = point
-        while value:
-            if value & 1:
-                result = self.add(result, temp)
-            temp = self.add(temp, temp)
-            value >>= 1
+        return self._to_affine(self._multiply_jacobian(value, point))
+
+    def _multiply_jacobian(self, value: int, point: ECCPoint) -> JacobianPoint:
+        """Multiply a point by a scalar, returning the result in Jacobian coordinates."""
+        return WnafTable(self, point)._multiply_jacobian(value)
+
+    def multi_multiply(self, scalars: Sequence[int], points: Sequence[Union[ECCPoint, Any]]) -> ECCPoint:
+        """
+        Compute sum(scalars[i] * points[i]) with a single conversion back to affine coordinates.
+        Entries of `points` may also be WnafTables of variable points, or fixed-base tables
+        exposing `_multiply_jacobian(value)`.
+        """
+        if len(scalars) != len(points):
+            raise ValueError("Scalars and points must have the same length.")
+        if self.strict:
+            for point in points:
+                if isinstance(point, ECCPoint) and not self.is_on_curve(point):
+                    raise ValueError("The point is not on the curve.")
+        return self._to_affine(self._multi_multiply_jacobian(scalars, points))
+
+    def _multi_multiply_jacobian(
+        self, scalars: Sequence[int], points: Sequence[Union[ECCPoint, Any]]
+    ) -> JacobianPoint:
+        """Compute a multi-scalar multiplication, returning the result in Jacobian coordinates."""
+        result = JACOBIAN_INFINITY
+        variable: List[Tuple[int, Union[ECCPoint, "WnafTable"]]] = []
+        for value, point in zip(scalars, points):
+            if isinstance(point, (ECCPoint, WnafTable)):
+                if value and not (point.point if isinstance(point, WnafTable) else point).is_origin:
+                    variable.append((value, point))
+            else:
+                result = self._jacobian_add(result, point._multiply_jacobian(value))
+
+        if len(variable) >= PIPPENGER_THRESHOLD:
+            variable_scalars, variable_points = [], []
+            for value, point in variable:
+                point = point.point if isinstance(point, WnafTable) else point
+                if value < 0:
+                    value, point = -value, self.negation_point(point)
+                variable_scalars.append(value)
+                variable_points.append(point)
+            return self._jacobian_add(result, self._pippenger(variable_scalars, variable_points))
+        return self._jacobian_add(result, self._straus(
+            [value for value, _ in variable],
+            [point if isinstance(point, WnafTable) else WnafTable(self, point) for _, point in variable]
+        ))
+
+    def _straus(self, scalars: List[int], tables: List["WnafTable"]) -> JacobianPoint:
+        """Interleaved width-w NAF multi-scalar multiplication sharing one chain of doublings."""
+        if not tables:
+            return JACOBIAN_INFINITY
+        terms = [(_wnaf(value, table.width), table.entries) for value, table in zip(scalars, tables)]
+        add_affine = self._jacobian_add_affine
+        result = JACOBIAN_INFINITY
+        for i in range(max(len(digits) for digits, _ in terms) - 1, -1, -1):
+            result = self._jacobian_double(result)
+            for digits, entries in terms:
+                if i < len(digits) and digits[i]:
+                    digit = digits[i]
+                    x, y, negative_y = entries[abs(digit) >> 1]
+                    result = add_affine(result, x, y if digit > 0 else negative_y)
+        return result
+
+    def _pippenger(self, scalars: List[int], points: List[ECCPoint]) -> JacobianPoint:
+        """Bucket-method multi-scalar multiplication for large batches."""
+        window = max(2, min(16, len(points).bit_length() - 2))
+        mask = (1 << window) - 1
+        bits = max(value.bit_length() for value in scalars)
+        result = JACOBIAN_INFINITY
+        for shift in range(((bits - 1) // window) * window, -1, -window):
+            for _ in range(window):
+                result = self._jacobian_double(result)
+            buckets = [JACOBIAN_INFINITY] * mask
+            for value, point in zip(scalars, points):
+                digit = (value >> shift) & mask
+                if digit:
+                    buckets[digit - 1] = self._jacobian_add_affine(buckets[digit - 1], point.x, point.y)
+            # sum(d * bucket[d]) via running sums from the highest bucket down.
+            running, window_sum = JACOBIAN_INFINITY, JACOBIAN_INFINITY
+            for bucket in reversed(buckets):
+                running = self._jacobian_add(running, bucket)
+                window_sum = self._jacobian_add(window_sum, running)
+            result = self._jacobian_add(result, window_sum)
+        return result
+
+    def _to_jacobian(self, point: ECCPoint) -> JacobianPoint:
+        """Convert an affine point to Jacobian coordinates."""
+        if point.is_origin:
+            return JACOBIAN_INFINITY
+        return self.field.number(point.x), self.field.number(point.y), 1
+
+    def _to_affine(self, point: JacobianPoint) -> ECCPoint:
+        """Convert a Jacobian point back to an affine point with a single inversion."""
+        X, Y, Z = point
+        if Z == 0:
+            return ECCPoint(0, 0, True)
+        p = self._p
+        z_inv = self.field.inverse(Z, p)
+        z_inv_2 = z_inv * z_inv % p
+        result = ECCPoint(int(X * z_inv_2 % p), int(Y * z_inv_2 * z_inv % p))
+        if self.strict and not self.is_on_curve(result):
+            raise ArithmeticError("Point arithmetic produced a point that is not on the curve.")
         return result
 
+    def batch_normalize(self, points: Sequence[JacobianPoint]) -> List[ECCPoint]:
+        """Convert Jacobian points to affine points with a single inversion."""
+        result = [
+            ECCPoint(0, 0, True) if pair is None else ECCPoint(int(pair[0]), int(pair[1]))
+            for pair in self._batch_to_affine(points)
+        ]
+        if self.strict and not all(self.is_on_curve(point) for point in result):
+            raise ArithmeticError("Point arithmetic produced a point that is not on the curve.")
+        return result
+
+    def _batch_to_affine(self, points: Sequence[JacobianPoint]) -> List[Optional[Tuple[int, int]]]:
+        """
+        Return the affine coordinates of Jacobian points as field backend numbers, or None for the
+        point at infinity. Montgomery's trick: invert the product of all Z once, then peel off
+        each 1/Z with two multiplications.
+        """
+        p = self._p
+        products, product = [], 1
+        for _, _, Z in points:
+            if Z:
+                product = product * Z % p
+            products.append(product)
+        inverse = self.field.inverse(product, p)
+
+        result: List[Optional[Tuple[int, int]]] = [None] * len(points)
+        for i in range(len(points) - 1, -1, -1):
+            X, Y, Z = points[i]
+            if not Z:
+                continue
+            # `inverse` is 1 / (Z_0 * ... * Z_i) over the finite points up to i.
+            z_inv = inverse * products[i - 1] % p if i else inverse
+            inverse = inverse * Z % p
+            z_inv_2 = z_inv * z_inv % p
+            result[i] = X * z_inv_2 % p, Y * z_inv_2 * z_inv % p
+        return result
+
+    def _jacobian_negate(self, point: JacobianPoint) -> JacobianPoint:
+        """Return the negation of a Jacobian point."""
+        X, Y, Z = point
+        return X, -Y % self._p, Z
+
+    def _jacobian_double(self, point: JacobianPoint) -> JacobianPoint:
+        """Double a Jacobian point."""
+        X, Y, Z = point
+        if Z == 0 or Y == 0:
+            return JACOBIAN_INFINITY
+        p = self._p
+        YY = Y * Y % p
+        S = 4 * X * YY % p
+        ZZ = Z * Z % p
+        M = (3 * X * X + self._a * ZZ * ZZ) % p
+        X3 = (M * M - 2 * S) % p
+        Y3 = (M * (S - X3) - 8 * YY * YY) % p
+        Z3 = 2 * Y * Z % p
+        return X3, Y3, Z3
+
+    def _jacobian_add(self, point_1: JacobianPoint, point_2: JacobianPoint) -> JacobianPoint:
+        """Add two Jacobian points."""
+        X1, Y1, Z1 = point_1
+        X2, Y2, Z2 = point_2
+        if Z1 == 0:
+            return point_2
+        if Z2 == 0:
+            return point_1
+        p = self._p
+        Z1Z1 = Z1 * Z1 % p
+        Z2Z2 = Z2 * Z2 % p
+        U1 = X1 * Z2Z2 % p
+        U2 = X2 * Z1Z1 % p
+        S1 = Y1 * Z2 * Z2Z2 % p
+        S2 = Y2 * Z1 * Z1Z1 % p
+        if U1 == U2:
+            if S1 != S2:
+                return JACOBIAN_INFINITY
+            return self._jacobian_double(point_1)
+        H = (U2 - U1) % p
+        R = (S2 - S1) % p
+        HH = H * H % p
+        HHH = H * HH % p
+        V = U1 * HH % p
+        X3 = (R * R - HHH - 2 * V) % p
+        Y3 = (R * (V - X3) - S1 * HHH) % p
+        Z3 = H * Z1 * Z2 % p
+        return X3, Y3, Z3
+
+    def _jacobian_add_affine(self, point: JacobianPoint, x: int, y: int) -> JacobianPoint:
+        """Add an affine point (x, y) to a Jacobian point (mixed addition)."""
+        X1, Y1, Z1 = point
+        if Z1 == 0:
+            return x, y, 1
+        p = self._p
+        Z1Z1 = Z1 * Z1 % p
+        U2 = x * Z1Z1 % p
+        S2 = y * Z1 * Z1Z1 % p
+        if X1 == U2:
+            if Y1 != S2:
+                return JACOBIAN_INFINITY
+            return self._jacobian_double(point)
+        H = (U2 - X1) % p
+        R = (S2 - Y1) % p
+        HH = H * H % p
+        HHH = H * HH % p
+        V = X1 * HH % p
+        X3 = (R * R - HHH - 2 * V) % p
+        Y3 = (R * (V - X3) - Y1 * HHH) % p
+        Z3 = Z1 * H % p
+        return X3, Y3, Z3
+
     def gens(self) -> ECCPoint:
         """Generate a random point on the curve."""
         while True:
@@ -78,4 +339,83 @@ class EllipticCurve:
                 return ECCPoint(x, square_root(y_square, self.p))
 
     def __repr__(self) -> str:
-        return f"Elliptic Curve over F_{self.p}: y^2 = x^3 + {self.a}x + {self.b}"
\ No newline at end of file
+        return f"Elliptic Curve over F_{self.p}: y^2 = x^3 + {self.a}x + {self.b}"
+
+
+class WnafTable:
+    """
+    Odd multiples P, 3P, ..., (2^(w-1) - 1)P of a variable point, in affine form with both signs
+    of y, for width-w NAF multiplication. Building one costs a doubling and 2^(w-2) - 1 additions,
+    so a point multiplied by several scalars should get one table, passed to multi_multiply in
+    place of the point.
+    """
+
+    __slots__ = ("elliptic_curve", "point", "width", "_entries")
+
+    def __init__(self, elliptic_curve: EllipticCurve, point: ECCPoint, width: int = WNAF_WIDTH):
+        if width < 2:
+            raise ValueError("NAF width must be at least 2.")
+        self.elliptic_curve = elliptic_curve
+        self.point = point
+        self.width = width
+        self._entries: Optional[List[Tuple[int, int, int]]] = None
+
+    @classmethod
+    def from_jacobian(
+        cls, elliptic_curve: EllipticCurve, points: Sequence[JacobianPoint], width: int = WNAF_WIDTH
+    ) -> List["WnafTable"]:
+        """Build the tables of several Jacobian points, normalizing all odd multiples with one inversion."""
+        count = 1 << (width - 2)
+        multiples = []
+        for point in points:
+            multiples += cls._odd_multiples(elliptic_curve, point, width)
+        pairs = elliptic_curve._batch_to_affine(multiples)
+        tables = []
+        for i in range(0, len(pairs), count):
+            if pairs[i] is None:
+                tables.append(cls(elliptic_curve, ECCPoint(0, 0, True), width))
+                continue
+            table = cls(elliptic_curve, ECCPoint(int(pairs[i][0]), int(pairs[i][1])), width)
+            table._entries = cls._signed(elliptic_curve, pairs[i:i + count])
+            tables.append(table)
+        return tables
+
+    @staticmethod
+    def _odd_multiples(elliptic_curve: EllipticCurve, point: JacobianPoint, width: int) -> List[JacobianPoint]:
+        double = elliptic_curve._jacobian_double(point)
+        multiples = [point]
+        for _ in range((1 << (width - 2)) - 1):
+            multiples.append(elliptic_curve._jacobian_add(multiples[-1], double))
+        return multiples
+
+    @staticmethod
+    def _signed(elliptic_curve: EllipticCurve, pairs: List[Tuple[int, int]]) -> List[Tuple[int, int, int]]:
+        p = elliptic_curve._p
+        return [(x, y, -y % p) for x, y in pairs]
+
+    @property
+    def entries(self) -> List[Tuple[int, int, int]]:
+        """Return (x, y, -y) of the odd multiples, computing them on first use."""
+        if self._entries is None:
+            curve = self.elliptic_curve
+            multiples = self._odd_multiples(curve, curve._to_jacobian(self.point), self.width)
+            self._entries = self._signed(curve, curve._batch_to_affine(multiples))
+        return self._entries
+
+    def multiply(self, value: int) -> ECCPoint:
+        """Multiply the point by a scalar."""
+        return self.elliptic_curve._to_affine(self._multiply_jacobian(value))
+
+    def _multiply_jacobian(self, value: int) -> JacobianPoint:
+        """Multiply the point by a scalar, returning the result in Jacobian coordinates."""
+        if value == 0 or self.point.is_origin:
+            return JACOBIAN_INFINITY
+        return self.elliptic_curve._straus([value], [self])
+
+
+for _attribute, _operation in (
+    ("add", "add"), ("_jacobian_add", "add"), ("_jacobian_add_affine", "add"), ("_jacobian_double", "double"),
+    ("_multiply_jacobian", "scalar_multiply"), ("_multi_multiply_jacobian", "multi_scalar_multiply"),
+):
+    metrics.register_counter(EllipticCurve, _attribute, _operation)
+metrics.register_counter(type(FIELD), "inverse", "inversion")
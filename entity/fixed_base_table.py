@@ -0,0 +1,146 @@
+from entity.elliptic_curve import EllipticCurve, ECCPoint, JacobianPoint, WnafTable, JACOBIAN_INFINITY
+from entity.types import EccPointPair
+from utils import metrics
+from typing import List, Optional, Tuple, Union
+
+DEFAULT_WINDOW = 4
+
+
+class FixedBaseTable:
+    """
+    Windowed precomputation for multiplying a fixed point by many scalars.
+
+    For a window width `w` the table holds d * 2^(w*j) * point for every window
+    position j and every digit d in [1, 2^w - 1], so a multiply is one mixed
+    addition per non-zero digit and no doublings. Memory grows with
+    ceil(bits / w) * (2^w - 1) stored points.
+    """
+
+    def __init__(
+        self, elliptic_curve: EllipticCurve, point: ECCPoint, order: int, window: int = DEFAULT_WINDOW,
+        rows: Optional[List[List[Optional[Tuple[int, int]]]]] = None
+    ):
+        if window < 1:
+            raise ValueError("Window width must be positive.")
+        self.elliptic_curve = elliptic_curve
+        self.point = point
+        self.order = order
+        self.window = window
+        self.number_of_windows = -(-order.bit_length() // window)
+        if rows is not None and (
+            len(rows) != self.number_of_windows or any(len(row) != (1 << window) - 1 for row in rows)
+        ):
+            raise ValueError("Precomputed rows do not match the table dimensions.")
+        self._table = self._convert(rows) if rows is not None else self._build()
+
+    @property
+    def rows(self) -> List[List[Optional[Tuple[int, int]]]]:
+        """Return the stored multiples, one row per window position, for saving the table."""
+        return self._table
+
+    def _build(self) -> List[List[Optional[Tuple[int, int]]]]:
+        """Compute the affine multiples for every window position."""
+        curve = self.elliptic_curve
+        row_length = (1 << self.window) - 1
+        multiples = []
+        base = curve._to_jacobian(self.point)
+        for _ in range(self.number_of_windows):
+            current = base
+            for _ in range(row_length):
+                multiples.append(current)
+                current = curve._jacobian_add(current, base)
+            # `current` is now 2^w * base, the base of the next window position.
+            base = current
+        # Coordinate pairs in field backend numbers, None for the point at infinity.
+        entries = curve._batch_to_affine(multiples)
+        return [entries[i:i + row_length] for i in range(0, len(entries), row_length)]
+
+    def _convert(self, rows: List[List[Optional[Tuple[int, int]]]]) -> List[List[Optional[Tuple[int, int]]]]:
+        """Convert saved coordinate pairs to field backend numbers."""
+        number = self.elliptic_curve.field.number
+        return [[entry if entry is None else (number(entry[0]), number(entry[1])) for entry in row] for row in rows]
+
+    @property
+    def size(self) -> int:
+        """Return the number of stored points."""
+        return self.number_of_windows * ((1 << self.window) - 1)
+
+    def multiply(self, value: int) -> ECCPoint:
+        """Multiply the fixed point by a scalar."""
+        return self.elliptic_curve._to_affine(self._multiply_jacobian(value))
+
+    def _multiply_jacobian(self, value: int) -> JacobianPoint:
+        """Multiply the fixed point by a scalar, returning the result in Jacobian coordinates."""
+        # The point lies in the group of order `order`, so the scalar can be reduced first;
+        # this also handles negative scalars.
+        value %= self.order
+        curve = self.elliptic_curve
+        window, mask = self.window, (1 << self.window) - 1
+        result = JACOBIAN_INFINITY
+        for row in self._table:
+            if not value:
+                break
+            digit = value & mask
+            value >>= window
+            if digit:
+                entry = row[digit - 1]
+                if entry is not None:
+                    result = curve._jacobian_add_affine(result, entry[0], entry[1])
+        return result
+
+
+class ElectionPrecomputation:
+    """Fixed-base tables for the election generator P, public key Q and candidate points M."""
+
+    def __init__(
+        self, P: FixedBaseTable, Q: Union[ECCPoint, FixedBaseTable], M: List[Union[ECCPoint, FixedBaseTable]]
+    ):
+        curve, order, window = P.elliptic_curve, P.order, P.window
+        self.window = window
+        self.P = P
+        self.Q = Q if isinstance(Q, FixedBaseTable) else FixedBaseTable(curve, Q, order, window)
+        self.M = [
+            point if isinstance(point, FixedBaseTable) else FixedBaseTable(curve, point, order, window)
+            for point in M
+        ]
+
+    @property
+    def size(self) -> int:
+        """Return the total number of stored points."""
+        return self.P.size + self.Q.size + sum(table.size for table in self.M)
+
+
+class BallotTables:
+    """
+    Variable-base tables of one ballot (Ap, Bp): the odd multiples of Ap and of each Bp - M[k],
+    built together on first use (with one inversion) and shared by every proof equation of the
+    ballot.
+    """
+
+    def __init__(self, elliptic_curve: EllipticCurve, encrypted_message: EccPointPair, M: List[ECCPoint]):
+        self.elliptic_curve = elliptic_curve
+        self.encrypted_message = encrypted_message
+        self.M = M
+        self._tables: Optional[List[WnafTable]] = None
+
+    def _build(self) -> List[WnafTable]:
+        if self._tables is None:
+            curve = self.elliptic_curve
+            Bp = curve._to_jacobian(self.encrypted_message.second)
+            points = [curve._to_jacobian(self.encrypted_message.first)] + [
+                curve._jacobian_add(Bp, curve._to_jacobian(curve.negation_point(point))) for point in self.M
+            ]
+            self._tables = WnafTable.from_jacobian(curve, points)
+        return self._tables
+
+    @property
+    def Ap(self) -> WnafTable:
+        """Return the table of Ap."""
+        return self._build()[0]
+
+    def shifted(self, k: int) -> WnafTable:
+        """Return the table of Bp - M[k]."""
+        return self._build()[k + 1]
+
+
+metrics.register_counter(FixedBaseTable, "_multiply_jacobian", "fixed_base_multiply")
@@ -0,0 +1,189 @@
+from entity.elliptic_curve import ECCPoint
+from entity.election_parameters import CurveParameters
+from entity.fixed_base_table import FixedBaseTable, ElectionPrecomputation
+from entity.ballot_store import BallotStore
+from entity.types import EccPointPair
+from entity.voting_server import VotingServer, ElectionData
+from typing import Optional, Tuple
+import json
+import mmap
+import os
+import struct
+
+# Layout, integers big-endian unless noted:
+#   header    _HEADER (little-endian)
+#   curve     a, b, p, order, private key, each `width` bytes
+#   points    P, Q, M[0..k), running sums A and B, each x and y of `width` bytes (all 0xff = infinity)
+#   tables    rows of P, Q, M[0..k) in that order, every entry a point as above
+#   extra     `extra_bytes` of JSON: opened tallies, results and the tally table path
+#   ballots   padding to 8 bytes, then the vote, public key, signature and proof columns of the
+#             BallotStore, `count` records each
+SNAPSHOT_MAGIC = b"EVSNAP"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct("<6sHIIIIQQ")
+
+
+def _write_int(f, value: int, width: int):
+    f.write(value.to_bytes(width, "big"))
+
+
+def _point_bytes(point: Optional[Tuple[int, int]], width: int) -> bytes:
+    if point is None:
+        return b"\xff" * (2 * width)
+    return int(point[0]).to_bytes(width, "big") + int(point[1]).to_bytes(width, "big")
+
+
+def _affine(point: ECCPoint) -> Optional[Tuple[int, int]]:
+    return None if point.is_origin else (point.x, point.y)
+
+
+def _from_affine(pair: Optional[Tuple[int, int]]) -> ECCPoint:
+    return ECCPoint(0, 0, True) if pair is None else ECCPoint(*pair)
+
+
+class _Reader:
+    def __init__(self, buffer: memoryview, width: int):
+        self.buffer = buffer
+        self.width = width
+        self.offset = _HEADER.size
+
+    def take(self, size: int) -> memoryview:
+        if self.offset + size > len(self.buffer):
+            raise ValueError("Truncated server snapshot.")
+        chunk = self.buffer[self.offset:self.offset + size]
+        self.offset += size
+        return chunk
+
+    def int(self) -> int:
+        return int.from_bytes(self.take(self.width), "big")
+
+    def pair(self) -> Optional[Tuple[int, int]]:
+        data = self.take(2 * self.width)
+        if data == b"\xff" * (2 * self.width):
+            return None
+        return int.from_bytes(data[:self.width], "big"), int.from_bytes(data[self.width:], "big")
+
+    def point(self) -> ECCPoint:
+        return _from_affine(self.pair())
+
+
+def write_snapshot(server: VotingServer, path: str):
+    """
+    Write the server's keys, tables, running tally and ballots to `path` atomically. Ballots
+    accepted while the snapshot is written are not included; the header records how many are.
+    """
+    with server._lock:
+        count = server.election_data.ballot_count()
+        sum_A, sum_B = server._sum_A, server._sum_B
+    curve = server.elliptic_curve
+    sum_A, sum_B = curve._to_affine(sum_A), curve._to_affine(sum_B)
+    data = server.election_data
+    width = (max(curve.p, server.order).bit_length() + 7) // 8
+    precomputation = server.precomputation
+    extra = json.dumps({
+        "encrypted_package": [
+            [_affine(pair.first), _affine(pair.second)] for pair in data.encrypted_package
+        ],
+        "decrypted_package": [_affine(point) for point in data.decrypted_package],
+        "result_package": data.result_package,
+        "results": server.results,
+        "tally_table_path": server.tally_solver.table_path,
+    }).encode()
+
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, width, server.number_of_candidate, server.maximum_number_of_voters,
+            server.precomputation_window, count, len(extra)
+        ))
+        for value in (curve.a, curve.b, curve.p, server.order, server._d):
+            _write_int(f, value, width)
+        for point in [server.P, server.Q] + server.M + [sum_A, sum_B]:
+            f.write(_point_bytes(_affine(point), width))
+        for table in [precomputation.P, precomputation.Q] + precomputation.M:
+            f.write(b"".join(_point_bytes(entry, width) for row in table.rows for entry in row))
+        f.write(extra)
+        f.write(b"\0" * (-f.tell() % 8))
+
+        ballots = data.ballots
+        if count:
+            for column in (ballots.votes, ballots.public_keys, ballots.signed_messages, ballots.proofs):
+                for buffer in column.buffers(0, count):
+                    f.write(buffer)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_path, path)
+
+
+def load_snapshot(path: str) -> VotingServer:
+    """
+    Restore a server written by write_snapshot. Tables are read back instead of recomputed,
+    and the ballot columns stay memory-mapped from the file.
+    """
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    buffer = memoryview(mapped)
+    columns = []
+    try:
+        magic, version, width, k, maximum_number_of_voters, window, count, extra_bytes = _HEADER.unpack_from(buffer, 0)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported server snapshot: {path}")
+
+        reader = _Reader(buffer, width)
+        value_a, value_b, value_p, value_order, private_key = (reader.int() for _ in range(5))
+        P, Q = reader.point(), reader.point()
+        M = [reader.point() for _ in range(k)]
+        sum_A, sum_B = reader.pair(), reader.pair()
+
+        curve = CurveParameters(value_a, value_b, value_p, value_order).elliptic_curve
+        number_of_windows = -(-value_order.bit_length() // window)
+        entries_per_row = (1 << window) - 1
+        tables = [
+            FixedBaseTable(
+                curve, point, value_order, window,
+                [[reader.pair() for _ in range(entries_per_row)] for _ in range(number_of_windows)]
+            )
+            for point in [P, Q] + M
+        ]
+        extra = json.loads(bytes(reader.take(extra_bytes)))
+        reader.take(-reader.offset % 8)
+        if tables[0].multiply(private_key) != Q:
+            raise ValueError(f"Server snapshot {path} is inconsistent.")
+
+        server = VotingServer(
+            k, maximum_number_of_voters, value_a, value_b, value_p, value_order, precomputation_window=window,
+            private_key=private_key, precomputation=ElectionPrecomputation(tables[0], tables[1], tables[2:])
+        )
+
+        ballot_store = BallotStore(value_p, value_order)
+        for column_width in (
+            ballot_store.votes.width, ballot_store.public_keys.width, ballot_store.signed_messages.width,
+            ballot_store.proof_width(k)
+        ):
+            columns.append(reader.take(count * column_width))
+        if reader.offset != len(buffer):
+            raise ValueError(f"Server snapshot {path} has trailing data.")
+    except BaseException:
+        # A rejected snapshot must not stay mapped: release the views of the mapping and close it.
+        for view in columns + [buffer]:
+            view.release()
+        mapped.close()
+        raise
+    if count:
+        ballot_store = BallotStore.from_buffers(value_p, value_order, k, count, *columns)
+
+    election_data = ElectionData(value_p, value_order, ballot_store)
+    election_data.encrypted_package = [
+        EccPointPair(_from_affine(first), _from_affine(second)) for first, second in extra["encrypted_package"]
+    ]
+    election_data.decrypted_package = [_from_affine(point) for point in extra["decrypted_package"]]
+    election_data.result_package = extra["result_package"]
+    election_data.results = extra["results"]
+    server.election_data = election_data
+    server.results = extra["results"]
+    server.number_of_voter = count
+    server._sum_A = curve._to_jacobian(_from_affine(sum_A))
+    server._sum_B = curve._to_jacobian(_from_affine(sum_B))
+    if extra["tally_table_path"] and os.path.exists(extra["tally_table_path"]):
+        server.load_tally_table(extra["tally_table_path"])
+    return server
@@ -0,0 +1,151 @@
+from entity.elliptic_curve import EllipticCurve, ECCPoint, JacobianPoint, JACOBIAN_INFINITY, NORMALIZE_BATCH
+from entity.fixed_base_table import ElectionPrecomputation
+from utils.math import iterate_tuple
+from utils.dlog import BabyStepGiantStep, BabyStepTable, baby_steps_for_bound
+from utils import metrics
+from math import comb
+from typing import List, Dict, Tuple, Optional
+
+
+class TallySolver:
+    """Recovers per-candidate counts from a decrypted aggregate, independent of the server's private key."""
+
+    def __init__(
+        self, elliptic_curve: EllipticCurve, precomputation: ElectionPrecomputation, M: List[ECCPoint],
+        maximum_number_of_voters: int
+    ):
+        self.elliptic_curve = elliptic_curve
+        self.precomputation = precomputation
+        self.M = M
+        self.maximum_number_of_voters = maximum_number_of_voters
+        self.table: Optional[BabyStepTable] = None
+        self.table_path: Optional[str] = None
+
+    def write_table(self, path: str):
+        """Build the baby-step table for the largest possible tally and write it to `path`."""
+        upper_bound = self.maximum_number_of_voters * (self.maximum_number_of_voters + 1) ** (len(self.M) - 1)
+        table_P = self.precomputation.P
+        BabyStepTable.generate(table_P, baby_steps_for_bound(upper_bound)).save(path, table_P.point)
+
+    def load_table(self, path: str):
+        """Memory-map a baby-step table previously written by write_table."""
+        table = BabyStepTable.load(path, self.precomputation.P.point)
+        if self.table is not None:
+            self.table.close()
+        self.table = table
+        self.table_path = path
+
+    def solve(self, decrypted_S: ECCPoint, n: int) -> List[int]:
+        """
+        Solve the vote decryption to determine the results. decrypted_S is T * P with
+        T = sum(count[i] * (max_voters + 1)^i), so T is found with a bounded discrete log
+        and its base-(max_voters + 1) digits are the per-candidate counts. The meet-in-the-middle
+        search is used instead when it needs fewer steps than baby-step giant-step with the
+        loaded table (or with building one, if none is loaded).
+        """
+        M = self.M
+        base = self.maximum_number_of_voters + 1
+        upper_bound = n * base ** (len(M) - 1)
+        mid = len(M) // 2
+        if comb(n + mid, mid) + comb(n + len(M) - mid, len(M) - mid) < self._baby_step_giant_step_steps(upper_bound):
+            return self.solve_meet_in_the_middle(decrypted_S, n)
+        return self.solve_baby_step_giant_step(decrypted_S, n)
+
+    def solve_baby_step_giant_step(self, decrypted_S: ECCPoint, n: int) -> List[int]:
+        """Solve the vote decryption with a bounded discrete log, building a table if none is loaded."""
+        M = self.M
+        base = self.maximum_number_of_voters + 1
+        upper_bound = n * base ** (len(M) - 1)
+        table = self.table
+        if table is None:
+            table = BabyStepTable.generate(self.precomputation.P, baby_steps_for_bound(upper_bound))
+        total = BabyStepGiantStep(self.precomputation.P, table).solve(decrypted_S, upper_bound)
+
+        counts = []
+        for _ in range(len(M)):
+            total, count = divmod(total, base)
+            counts.append(count)
+        if total or sum(counts) != n:
+            raise ValueError("Failed to solve the vote decryption.")
+        return counts
+
+    def _baby_step_giant_step_steps(self, upper_bound: int) -> int:
+        """Return the point additions baby-step giant-step needs to cover [0, upper_bound]."""
+        if self.table is not None:
+            return upper_bound // (2 * self.table.baby_steps + 1) + 2
+        baby_steps = baby_steps_for_bound(upper_bound)
+        return baby_steps + upper_bound // (2 * baby_steps + 1) + 2
+
+    def solve_meet_in_the_middle(self, decrypted_S: ECCPoint, n: int) -> List[int]:
+        """Solve the vote decryption by matching partial tallies of both candidate halves."""
+        elliptic_curve = self.elliptic_curve
+        M = self.M
+        mid = len(M) // 2
+        left_moves, right_moves = self._tuple_moves(M[:mid]), self._tuple_moves(M[mid:])
+        data = [dict() for _ in range(n + 1)]
+
+        # Consecutive tuples differ by one unit move, so each step is a single point addition.
+        # Points are normalized NORMALIZE_BATCH at a time to share inversions.
+        pt, cur_sum = JACOBIAN_INFINITY, 0
+        chunk = []
+        for tuple_, increased, decreased in iterate_tuple(n, mid):
+            if increased is not None or decreased is not None:
+                pt = elliptic_curve._jacobian_add(pt, left_moves[increased, decreased])
+                cur_sum += (increased is not None) - (decreased is not None)
+            chunk.append((pt, cur_sum, list(tuple_)))
+            if len(chunk) == NORMALIZE_BATCH:
+                self._store_chunk(data, chunk)
+        self._store_chunk(data, chunk)
+
+        target, cur_sum = elliptic_curve._to_jacobian(decrypted_S), 0
+        chunk = []
+        for tuple_, increased, decreased in iterate_tuple(n, len(M) - mid):
+            if increased is not None or decreased is not None:
+                target = elliptic_curve._jacobian_add(
+                    target, elliptic_curve._jacobian_negate(right_moves[increased, decreased])
+                )
+                cur_sum += (increased is not None) - (decreased is not None)
+            chunk.append((target, cur_sum, list(tuple_)))
+            if len(chunk) == NORMALIZE_BATCH:
+                match = self._match_chunk(data, chunk, n)
+                if match is not None:
+                    return match
+        match = self._match_chunk(data, chunk, n)
+        if match is not None:
+            return match
+
+        raise ValueError("Failed to solve the vote decryption.")
+
+    def _store_chunk(self, data: List[Dict[ECCPoint, List[int]]], chunk: List[Tuple[JacobianPoint, int, List[int]]]):
+        """Record the left-half tuples of a chunk under their affine partial tallies, emptying it."""
+        points = self.elliptic_curve.batch_normalize([pt for pt, _, _ in chunk])
+        for point, (_, cur_sum, tuple_) in zip(points, chunk):
+            data[cur_sum][point] = tuple_
+        chunk.clear()
+
+    def _match_chunk(
+        self, data: List[Dict[ECCPoint, List[int]]], chunk: List[Tuple[JacobianPoint, int, List[int]]], n: int
+    ) -> Optional[List[int]]:
+        """Return the first full tuple completing a right-half tuple of the chunk, emptying it."""
+        points = self.elliptic_curve.batch_normalize([target for target, _, _ in chunk])
+        for point, (_, cur_sum, tuple_) in zip(points, chunk):
+            match = data[n - cur_sum].get(point)
+            if match is not None:
+                return match + tuple_
+        chunk.clear()
+        return None
+
+    def _tuple_moves(self, M: List[ECCPoint]) -> Dict[Tuple[Optional[int], Optional[int]], JacobianPoint]:
+        """Return the point change for every (increased, decreased) move of iterate_tuple over M."""
+        elliptic_curve = self.elliptic_curve
+        moves = {}
+        for i, point in enumerate(M):
+            moves[i, None] = elliptic_curve._to_jacobian(point)
+            moves[None, i] = elliptic_curve._to_jacobian(elliptic_curve.negation_point(point))
+            for j, other in enumerate(M):
+                if i != j:
+                    moves[i, j] = elliptic_curve._to_jacobian(elliptic_curve.sub(point, other))
+        return moves
+
+
+metrics.register_timer(TallySolver, "solve", "solve")
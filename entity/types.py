@@ -1,7 +1,9 @@
 from entity.ecc_point import ECCPoint
-from typing import List
+from typing import Dict, List
 
 class IntPair:
+    __slots__ = ("x", "y")
+
     def __init__(self, x: int, y: int):
         self.x = x
         self.y = y
@@ -15,7 +17,13 @@ class IntPair:
     def __repr__(self):
         return f"IntPair({self.x}, {self.y})"
 
+    def to_dict(self) -> Dict:
+        """Return the pair as plain JSON-compatible values."""
+        return {"x": self.x, "y": self.y}
+
 class EccPointPair:
+    __slots__ = ("first", "second")
+
     def __init__(self, x: ECCPoint, y: ECCPoint):
         self.first = x
         self.second = y
@@ -29,7 +37,13 @@ class EccPointPair:
     def __repr__(self):
         return f"EccPointPair({self.first}, {self.second})"
 
+    def to_dict(self) -> Dict:
+        """Return the pair as plain JSON-compatible values."""
+        return {"first": self.first.to_dict(), "second": self.second.to_dict()}
+
 class ProofOfWork:
+    __slots__ = ("A", "B", "u", "w")
+
     def __init__(self, A: List[ECCPoint], B: list[ECCPoint], u: list[int], w: list[int]):
         self.A = A
         self.B = B
@@ -45,4 +59,13 @@ class ProofOfWork:
         )
 
     def __hash__(self):
-        return hash((tuple(self.A), tuple(self.B), tuple(self.u), tuple(self.w)))
\ No newline at end of file
+        return hash((tuple(self.A), tuple(self.B), tuple(self.u), tuple(self.w)))
+
+    def to_dict(self) -> Dict:
+        """Return the proof as plain JSON-compatible values."""
+        return {
+            "A": [point.to_dict() for point in self.A],
+            "B": [point.to_dict() for point in self.B],
+            "u": list(self.u),
+            "w": list(self.w),
+        }
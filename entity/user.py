@@ -1,89 +1,107 @@
-from entity.elliptic_curve import EllipticCurve, ECCPoint
+from entity.election_parameters import ElectionParameters
+from entity.fixed_base_table import BallotTables
 from entity.types import ProofOfWork, EccPointPair
-from entity.voting_server import IntPair
-from utils.math import get_random_relatively_prime_value, generate_random_rsa_key, hash_array_of_points
-from typing import Tuple, List, Dict
+from entity.types import IntPair
+from utils.math import get_random_relatively_prime_value, generate_random_rsa_key, hash_array_of_points, digest_of_points
+from utils.key_pool import RSAKeyPool
+from utils import metrics
+from utils.field import FIELD
+from typing import Tuple, Optional
 
 class User:
-    def __init__(self, user_name: str):
-        self._p, self._q, self._e = generate_random_rsa_key()  # private keys
+    def __init__(
+        self, user_name: str, key_pool: Optional[RSAKeyPool] = None, rsa_key: Optional[Tuple[int, int, int]] = None
+    ):
+        # private keys
+        if rsa_key is None:
+            rsa_key = key_pool.get() if key_pool is not None else generate_random_rsa_key()
+        self._p, self._q, self._e = rsa_key
         self._n = self._p * self._q  # public key
         self._phi = (self._p - 1) * (self._q - 1)  # private
-        self._d = pow(self._e, -1, self._phi)  # private
+        self._d = int(FIELD.inverse(self._e, self._phi))  # private
+        # CRT parameters (private): signing works modulo p and q separately.
+        self._dp = self._d % (self._p - 1)
+        self._dq = self._d % (self._q - 1)
+        self._q_inv = int(FIELD.inverse(self._q, self._p))
         self.user_name = user_name
 
     def sign(self, message: int) -> int:
         """Sign a message using the private key."""
-        return pow(message, self._d, self._n)
+        m1 = FIELD.pow(message, self._dp, self._p)
+        m2 = FIELD.pow(message, self._dq, self._q)
+        h = self._q_inv * (m1 - m2) % self._p
+        return int(m2 + h * self._q)
 
-    def vote(self, candidate: int, server_public_key: Dict) -> Tuple[
-        EccPointPair,
+    def vote(self, candidate: int, parameters: ElectionParameters) -> Tuple[
         EccPointPair,
+        int,
         IntPair,
         ProofOfWork
     ]:
         """Generate a vote for a candidate."""
-        order = server_public_key["order"]
-        elliptic_curve = server_public_key["elliptic_curve"]
-        assert isinstance(elliptic_curve, EllipticCurve)
-        P = server_public_key["P"]
-        Q = server_public_key["Q"]
+        order = parameters.order
+        elliptic_curve = parameters.elliptic_curve
+        precomputation = parameters.precomputation
         r = get_random_relatively_prime_value(order)
-        M = server_public_key["M"]
+        M = parameters.M
 
         if candidate < 0 or candidate >= len(M):
             raise ValueError(f"Invalid candidate id: {candidate}")
 
         candidate_key = M[candidate]
         encrypted_message = EccPointPair(
-            elliptic_curve.multiply(r, P),
-            elliptic_curve.add(candidate_key, elliptic_curve.multiply(r, Q))
-        )
-        signed_message = EccPointPair(
-            ECCPoint(self.sign(encrypted_message.first.x), self.sign(encrypted_message.first.y)),
-            ECCPoint(self.sign(encrypted_message.second.x), self.sign(encrypted_message.second.y))
+            precomputation.P.multiply(r),
+            elliptic_curve.add(candidate_key, precomputation.Q.multiply(r))
         )
-        proof_of_work = self._generate_proof_of_work(candidate, r, encrypted_message, server_public_key)
+        signed_message = self.sign(digest_of_points([encrypted_message.first, encrypted_message.second]))
+        proof_of_work = self._generate_proof_of_work(candidate, r, encrypted_message, parameters)
 
         return encrypted_message, signed_message, self.get_public_key(), proof_of_work
 
     def _generate_proof_of_work(
-        self, candidate: int, r: int, encrypted_message: EccPointPair, server_public_key: Dict
+        self, candidate: int, r: int, encrypted_message: EccPointPair, parameters: ElectionParameters
     ) -> ProofOfWork:
         """Generate proof of work for the vote."""
-        Ap, Bp = encrypted_message.first, encrypted_message.second
-        order = server_public_key["order"]
-        elliptic_curve = server_public_key["elliptic_curve"]
-        assert isinstance(elliptic_curve, EllipticCurve)
-        P = server_public_key["P"]
-        Q = server_public_key["Q"]
-        M = server_public_key["M"]
+        order = parameters.order
+        elliptic_curve = parameters.elliptic_curve
+        table_P = parameters.precomputation.P
+        table_Q = parameters.precomputation.Q
+        M = parameters.M
+        tables = BallotTables(elliptic_curve, encrypted_message, M)
 
         w = [get_random_relatively_prime_value(order) for _ in range(len(M))]
         u = [get_random_relatively_prime_value(order) for _ in range(len(M))]
         s = get_random_relatively_prime_value(order)
 
         A = [
-            elliptic_curve.add(
-                elliptic_curve.multiply(w[k], P),
-                elliptic_curve.multiply(u[k], Ap)
-            ) if k != candidate else elliptic_curve.multiply(s, P)
+            elliptic_curve._multi_multiply_jacobian([w[k], u[k]], [table_P, tables.Ap])
+            if k != candidate else table_P._multiply_jacobian(s)
             for k in range(len(M))
         ]
         B = [
-            elliptic_curve.add(
-                elliptic_curve.multiply(w[k], Q),
-                elliptic_curve.multiply(u[k], elliptic_curve.sub(Bp, M[k]))
-            ) if k != candidate else elliptic_curve.multiply(s, Q)
+            elliptic_curve._multi_multiply_jacobian([w[k], u[k]], [table_Q, tables.shifted(k)])
+            if k != candidate else table_Q._multiply_jacobian(s)
             for k in range(len(M))
         ]
+        # All 2k commitments share one inversion.
+        commitments = elliptic_curve.batch_normalize(A + B)
+        A, B = commitments[:len(M)], commitments[len(M):]
 
         challenge = hash_array_of_points(A + B, elliptic_curve.p)
-        u[candidate] += challenge - sum(u)
-        w[candidate] = s - u[candidate] * r
+        u[candidate] = (u[candidate] + challenge - sum(u)) % order
+        w[candidate] = (s - u[candidate] * r) % order
 
         return ProofOfWork(A, B, u, w)
 
+    def get_rsa_key(self) -> Tuple[int, int, int]:
+        """Return the private (p, q, e) triple, e.g. for persisting the user."""
+        return self._p, self._q, self._e
+
     def get_public_key(self) -> IntPair:
         """Return the public key."""
-        return IntPair(self._n, self._e)
\ No newline at end of file
+        return IntPair(self._n, self._e)
+
+
+metrics.register_timer(User, "vote", "vote")
+metrics.register_timer(User, "sign", "sign")
+metrics.register_timer(User, "_generate_proof_of_work", "prove")
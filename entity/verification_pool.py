@@ -0,0 +1,39 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from entity.ballot_verifier import BallotVerifier
+from entity.election_parameters import ElectionParameters
+from entity.types import EccPointPair, ProofOfWork
+from utils import metrics
+from typing import Optional
+
+# Verifier of the election this worker process was started for.
+_worker_verifier: Optional[BallotVerifier] = None
+
+
+def _init_worker(parameters: ElectionParameters):
+    """Build the election's fixed-base tables once per worker process."""
+    global _worker_verifier
+    _worker_verifier = BallotVerifier.from_parameters(parameters)
+
+
+def _verify_vote(encrypted_message: EccPointPair, proof_of_work: ProofOfWork) -> bool:
+    """Verify one ballot's proof in a worker process."""
+    return _worker_verifier.verify_vote(encrypted_message, proof_of_work)
+
+
+class VerificationPool:
+    """Process pool that verifies ballot proofs for a single election in parallel."""
+
+    def __init__(self, parameters: ElectionParameters, max_workers: Optional[int] = None):
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_worker,
+            initargs=(parameters,),
+        )
+
+    def submit(self, encrypted_message: EccPointPair, proof_of_work: ProofOfWork) -> "Future[bool]":
+        """Schedule verification of a ballot's proof and return a future for the result."""
+        return metrics.submit(self._executor, _verify_vote, encrypted_message, proof_of_work)
+
+    def shutdown(self, wait: bool = True):
+        """Stop the worker processes."""
+        self._executor.shutdown(wait=wait)
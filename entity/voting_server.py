@@ -1,167 +1,479 @@
-from entity.elliptic_curve import EllipticCurve, ECCPoint
+from entity.elliptic_curve import ECCPoint, JacobianPoint, JACOBIAN_INFINITY
+from entity.election_parameters import CurveParameters, ElectionParameters
 from entity.types import IntPair, EccPointPair, ProofOfWork
-from utils.math import get_random_relatively_prime_value, hash_array_of_points, generate_tuple
-from typing import List, Dict, Tuple, Optional
+from entity.fixed_base_table import FixedBaseTable, ElectionPrecomputation, DEFAULT_WINDOW
+from entity.ballot_verifier import BallotVerifier
+from entity.verification_pool import VerificationPool
+from entity.tally_solver import TallySolver
+from entity.ballot_store import BallotStore, BallotRecord
+from entity.election_tasks import verify_vote, find_valid_votes
+from utils.math import get_random_relatively_prime_value, digest_of_points
+from utils import metrics
+from utils.field import FIELD
+from collections.abc import Sequence
+from concurrent.futures import Executor, Future
+from functools import partial
+from typing import Callable, List, Dict, Iterable, Iterator, Tuple, Optional
+import threading
 import os
+import sys
 
 
 def _verify_message(message: int, signed_message: int, public_key: IntPair) -> bool:
     """Verify a signed message using the public key."""
     n, e = public_key.x, public_key.y
 
-    if pow(signed_message, e, n) != message:
+    if FIELD.pow(signed_message, e, n) != message:
         raise ValueError("Invalid signed message.")
 
+def _resolve_when_durable(result: "Future[bool]", durable: Future):
+    """Report an accepted vote once the ballot log has made it durable."""
+    if durable.exception() is not None:
+        result.set_exception(durable.exception())
+    else:
+        result.set_result(True)
+
+class _BallotColumnView(Sequence):
+    """Read-only list-like view of one field of the ballots in a BallotStore."""
+
+    def __init__(self, ballots: BallotStore, decode: Callable[[int], object]):
+        self._ballots = ballots
+        self._decode = decode
+
+    def __len__(self) -> int:
+        return len(self._ballots)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._decode(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Ballot index out of range.")
+        return self._decode(index)
+
 class ElectionData:
-    def __init__(self):
-        self.voter_public_key: List[IntPair] = []
-        self.voter_vote: List[EccPointPair] = []
-        self.voter_signed_message: List[EccPointPair] = []
-        self.voter_prove_of_work: List[ProofOfWork] = []
+    def __init__(self, value_p: int, value_order: int, ballots: Optional[BallotStore] = None):
+        self.ballots = ballots if ballots is not None else BallotStore(value_p, value_order)
+        self.voter_public_key: Sequence[IntPair] = _BallotColumnView(self.ballots, self.ballots.public_key)
+        self.voter_vote: Sequence[EccPointPair] = _BallotColumnView(self.ballots, self.ballots.vote)
+        self.voter_signed_message: Sequence[int] = _BallotColumnView(self.ballots, self.ballots.signed_message)
+        self.voter_prove_of_work: Sequence[ProofOfWork] = _BallotColumnView(self.ballots, self.ballots.proof_of_work)
         self.encrypted_package: List[EccPointPair] = []
         self.decrypted_package: List[ECCPoint] = []
         self.result_package: List[List[int]] = []
         self.results: Optional[List[int]] = None
 
+    def add_ballot(
+        self, vote: EccPointPair, public_key: IntPair, signed_message: int, proof_of_work: ProofOfWork
+    ) -> BallotRecord:
+        """Record an accepted ballot and return its column records. Raises ValueError if a field does not fit."""
+        try:
+            return self.ballots.append(vote, public_key, signed_message, proof_of_work)
+        except OverflowError:
+            raise ValueError("Ballot field is too large to record.")
+
+    def ballot_count(self) -> int:
+        """Return the number of fully recorded ballots."""
+        return len(self.ballots)
+
+    def iter_ballots(
+        self, start: int = 0, stop: Optional[int] = None
+    ) -> Iterator[Tuple[EccPointPair, IntPair, int, ProofOfWork]]:
+        """Lazily yield (vote, public key, signed message, proof) for the ballots in [start, stop)."""
+        stop = self.ballot_count() if stop is None else min(stop, self.ballot_count())
+        for index in range(start, stop):
+            yield self.ballots.ballot(index)
+
+    def to_dict(self) -> Dict:
+        """Return the election data as plain JSON-compatible values."""
+        ballots = list(self.iter_ballots())
+        return {
+            "voter_public_key": [public_key.to_dict() for _, public_key, _, _ in ballots],
+            "voter_vote": [vote.to_dict() for vote, _, _, _ in ballots],
+            "voter_signed_message": [signed_message for _, _, signed_message, _ in ballots],
+            "voter_prove_of_work": [proof_of_work.to_dict() for _, _, _, proof_of_work in ballots],
+            "encrypted_package": [pair.to_dict() for pair in self.encrypted_package],
+            "decrypted_package": [point.to_dict() for point in self.decrypted_package],
+            "result_package": [list(counts) for counts in self.result_package],
+            "results": self.results,
+        }
+
 class VotingServer:
-    def __init__(self, _number_of_candidate: int, maximum_number_of_voter: int, value_a: int, value_b: int, value_p: int, value_order: int):
+    def __init__(self, _number_of_candidate: int, maximum_number_of_voter: int, value_a: int, value_b: int, value_p: int, value_order: int,
+                 precomputation_window: int = DEFAULT_WINDOW, private_key: Optional[int] = None,
+                 base_point: Optional[ECCPoint] = None, precomputation: Optional[ElectionPrecomputation] = None):
+        self.precomputation_window = precomputation_window
         self.number_of_candidate = _number_of_candidate
         self.maximum_number_of_voters = maximum_number_of_voter
         self.number_of_voter = 0
-        self.votes: List[EccPointPair] = []
+        # Running homomorphic sum of accepted ciphertexts, kept in Jacobian coordinates.
+        self._sum_A: JacobianPoint = JACOBIAN_INFINITY
+        self._sum_B: JacobianPoint = JACOBIAN_INFINITY
         self.results: Optional[List[int]] = None
-        self.election_data = ElectionData()
-        self._set_up(value_a, value_b, value_p, value_order)
-
-    def _set_up(self, _value_a: int, _value_b: int, _value_p: int, _value_order: int):
-        """Initialize the elliptic curve and related parameters."""
-        self.elliptic_curve = EllipticCurve(
-            a=_value_a,
-            b=_value_b,
-            p=_value_p
-        )
+        self.election_data = ElectionData(value_p, value_order)
+        self.verification_pool: Optional[VerificationPool] = None
+        # Guards acceptance of verified ballots; tickets keep them in submission order. Reentrant
+        # because a log future that has already failed runs its rollback inside _accept_vote.
+        self._lock = threading.RLock()
+        self._next_ticket = 0
+        self._next_accepted_ticket = 0
+        self._verified: Dict[int, Tuple[Tuple, Optional[bool], Optional[BaseException], Future]] = {}
+        # Called with each accepted ballot's index and records, under the acceptance lock; the
+        # returned future completes once the ballot is durable, and the vote is reported after it.
+        self.ballot_log: Optional[Callable[[int, BallotRecord], Future]] = None
+        # Ballot log failure; while set, ballots are refused (see _roll_back_unlogged).
+        self._log_error: Optional[BaseException] = None
+        self._set_up(value_a, value_b, value_p, value_order, private_key, base_point, precomputation)
+
+    def _set_up(
+        self, _value_a: int, _value_b: int, _value_p: int, _value_order: int,
+        private_key: Optional[int] = None, base_point: Optional[ECCPoint] = None,
+        precomputation: Optional[ElectionPrecomputation] = None
+    ):
+        """
+        Initialize the elliptic curve and related parameters, generating the keys unless given.
+        Tables restored from a snapshot are passed as `precomputation` (together with the private key).
+        """
+        self.curve = CurveParameters(_value_a, _value_b, _value_p, _value_order)
+        self.elliptic_curve = self.curve.elliptic_curve
         self.order = _value_order
-        self._d = get_random_relatively_prime_value(self.order)
-        self.P = self.elliptic_curve.gens()
-        self.Q = self.elliptic_curve.multiply(self._d, self.P)
-        self.M = [
-            self.elliptic_curve.multiply(
-                pow(self.maximum_number_of_voters + 1, i, self.order), self.P
-            ) for i in range(self.number_of_candidate)
-        ]
-
-    def get_public_key(self) -> Dict:
+        self._d = private_key if private_key is not None else get_random_relatively_prime_value(self.order)
+        if precomputation is not None:
+            if private_key is None:
+                raise ValueError("Restoring precomputed tables requires the private key.")
+            self.P, self.Q = precomputation.P.point, precomputation.Q.point
+            self.M = [table.point for table in precomputation.M]
+            self.precomputation = precomputation
+        else:
+            self.P = base_point if base_point is not None else self.elliptic_curve.gens()
+            table_P = FixedBaseTable(self.elliptic_curve, self.P, self.order, self.precomputation_window)
+            # Q and M[i] = (max_voters + 1)^i * P share one inversion.
+            self.Q, *self.M = self.elliptic_curve.batch_normalize([table_P._multiply_jacobian(self._d)] + [
+                table_P._multiply_jacobian(
+                    pow(self.maximum_number_of_voters + 1, i, self.order)
+                ) for i in range(self.number_of_candidate)
+            ])
+            self.precomputation = ElectionPrecomputation(table_P, self.Q, self.M)
+        self.parameters = ElectionParameters(
+            self.curve, self.P, self.Q, self.M, self.precomputation_window, self.maximum_number_of_voters,
+            self.precomputation
+        )
+        self.precomputation = self.parameters.precomputation
+        self.verifier = BallotVerifier(self.elliptic_curve, self.order, self.M, self.precomputation)
+        self.tally_solver = TallySolver(self.elliptic_curve, self.precomputation, self.M, self.maximum_number_of_voters)
+
+    def start_verification_pool(self, max_workers: Optional[int] = None):
+        """Verify ballot proofs in a pool of worker processes initialized with this election."""
+        if self.verification_pool is None:
+            self.verification_pool = VerificationPool(self.parameters, max_workers)
+
+    def shutdown_verification_pool(self):
+        """Stop the verification worker processes."""
+        if self.verification_pool is not None:
+            self.verification_pool.shutdown()
+            self.verification_pool = None
+
+    def get_public_key(self) -> ElectionParameters:
         """Return the public key of the voting server."""
-        return {
-            "P": self.P,
-            "Q": self.Q,
-            "order": self.order,
-            "elliptic_curve": self.elliptic_curve,
-            "M": self.M
-        }
+        return self.parameters
+
+    def public_parameters(self) -> ElectionParameters:
+        """Return the public election parameters, which are hashable and pickle without their tables."""
+        return self.parameters
 
     def cast_vote(self, vote: Tuple[
         EccPointPair,
+        int,
+        IntPair,
+        ProofOfWork,
+    ]) -> bool:
+        """Cast a vote after verifying its validity. Returns whether the vote was accepted."""
+        return self.submit_vote(vote).result()
+
+    def submit_vote(self, vote: Tuple[
         EccPointPair,
+        int,
         IntPair,
         ProofOfWork,
-    ]):
-        """Cast a vote after verifying its validity."""
+    ], executor: Optional[Executor] = None) -> "Future[bool]":
+        """
+        Check a vote's points and signatures, then verify its proof in the verification pool,
+        in `executor` when there is no pool, or inline. Verified votes are accepted in
+        submission order.
+        """
         encrypted_message, signed_message, public_key, proof_of_work = vote
-
-        for i in range(2):
-            _verify_message(encrypted_message.first.x, signed_message.first.x, public_key)
-            _verify_message(encrypted_message.second.y, signed_message.second.y, public_key)
-
-        if self._verify_vote(encrypted_message, proof_of_work):
-            self.number_of_voter += 1
-            self.votes.append(encrypted_message)
-            self.election_data.voter_vote.append(encrypted_message)
-            self.election_data.voter_signed_message.append(signed_message)
-            self.election_data.voter_public_key.append(public_key)
-            self.election_data.voter_prove_of_work.append(proof_of_work)
-
-
-
+        self._validate_ballot_points(encrypted_message, proof_of_work)
+        self._verify_signature(encrypted_message, signed_message, public_key)
+
+        result: "Future[bool]" = Future()
+        with self._lock:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+
+        # Every ticket must reach _complete_vote, or the ballots after it are never accepted.
+        try:
+            if self.verification_pool is not None:
+                verification = self.verification_pool.submit(encrypted_message, proof_of_work)
+            elif executor is not None:
+                verification = metrics.submit(executor, verify_vote, self.public_parameters(), encrypted_message, proof_of_work)
+            else:
+                verification = None
+                accepted, error = self._verify_vote(encrypted_message, proof_of_work), None
+        except Exception as e:
+            verification, accepted, error = None, None, e
+        if verification is None:
+            self._complete_vote(ticket, vote, accepted, error, result)
+            return result
+
+        def on_verified(done: "Future[bool]"):
+            error = done.exception()
+            self._complete_vote(ticket, vote, None if error else done.result(), error, result)
+
+        verification.add_done_callback(on_verified)
+        return result
+
+    def _complete_vote(
+        self, ticket: int, vote: Tuple, accepted: Optional[bool], error: Optional[BaseException], result: Future
+    ):
+        """Record a verification outcome and accept every ballot whose turn has come."""
+        finished = []
+        with self._lock:
+            self._verified[ticket] = (vote, accepted, error, result)
+            while self._next_accepted_ticket in self._verified:
+                vote, accepted, error, result = self._verified.pop(self._next_accepted_ticket)
+                self._next_accepted_ticket += 1
+                if accepted and self._log_error is not None:
+                    accepted, error = None, self._log_error
+                durable = None
+                if accepted:
+                    try:
+                        durable = self._accept_vote(*vote)
+                    except ValueError as e:
+                        accepted, error = None, e
+                finished.append((accepted, error, result, durable))
+
+        for accepted, error, result, durable in finished:
+            if error is not None:
+                result.set_exception(error)
+            elif durable is not None:
+                durable.add_done_callback(partial(_resolve_when_durable, result))
+            else:
+                result.set_result(accepted)
+
+    def cast_votes_batch(self, votes: List[Tuple[
+        EccPointPair,
+        int,
+        IntPair,
+        ProofOfWork,
+    ]], executor: Optional[Executor] = None) -> List[bool]:
+        """
+        Cast many votes, verifying their proofs together (in `executor` when given).
+        Returns whether each vote was accepted.
+        """
+        pending = []
+        for index, (encrypted_message, signed_message, public_key, proof_of_work) in enumerate(votes):
+            try:
+                self._validate_ballot_points(encrypted_message, proof_of_work)
+                self._verify_signature(encrypted_message, signed_message, public_key)
+                if not self.verifier.verify_proof_challenge(proof_of_work):
+                    continue
+            except ValueError:
+                continue
+            pending.append(index)
+
+        ballots = [(encrypted_message, proof_of_work) for encrypted_message, _, _, proof_of_work in votes]
+        if executor is not None:
+            valid = metrics.submit(executor, find_valid_votes, self.public_parameters(), ballots, pending).result()
+        else:
+            valid = self.verifier.find_valid_votes(ballots, pending)
+        accepted = [False] * len(votes)
+        durable = []
+        with self._lock:
+            if self._log_error is not None:
+                raise self._log_error
+            for index in valid:
+                try:
+                    durable.append(self._accept_vote(*votes[index]))
+                except ValueError:
+                    continue
+                accepted[index] = True
+        for future in durable:
+            if future is not None:
+                future.result()
+        return accepted
+
+    def _accept_vote(
+        self, encrypted_message: EccPointPair, signed_message: int, public_key: IntPair,
+        proof_of_work: ProofOfWork
+    ):
+        """
+        Record a verified vote. Callers hold the acceptance lock and check that the ballot log
+        has not failed. Returns the ballot log's durability future, if there is a ballot log.
+        """
+        index = self.election_data.ballot_count()
+        records = self.election_data.add_ballot(encrypted_message, public_key, signed_message, proof_of_work)
+        self._add_to_tally(encrypted_message)
+        if self.ballot_log is None:
+            return None
+        durable = self.ballot_log(index, records)
+        durable.add_done_callback(partial(self._roll_back_unlogged, index))
+        return durable
+
+    def _roll_back_unlogged(self, index: int, durable: Future):
+        """
+        If the ballot at `index` could not be logged, remove it and every later ballot (the log
+        fails them all) from the store and the tally, and refuse ballots until resume_ballot_log,
+        so the server never counts a ballot that a restart would lose.
+        """
+        error = durable.exception()
+        if error is None:
+            return
+        with self._lock:
+            if self._log_error is None:
+                self._log_error = error
+            count = self.election_data.ballot_count()
+            if index >= count:
+                return
+            curve = self.elliptic_curve
+            for i in range(index, count):
+                vote = self.election_data.ballots.vote(i)
+                self._sum_A = curve._jacobian_add(self._sum_A, curve._to_jacobian(curve.negation_point(vote.first)))
+                self._sum_B = curve._jacobian_add(self._sum_B, curve._to_jacobian(curve.negation_point(vote.second)))
+            self.election_data.ballots.truncate(index)
+            self.number_of_voter -= count - index
+
+    def resume_ballot_log(self):
+        """
+        Accept ballots again after a ballot log failure, once the log has failed every ballot
+        submitted before it recovered (so the store again matches what is logged).
+        """
+        with self._lock:
+            self._log_error = None
+
+    def _add_to_tally(self, encrypted_message: EccPointPair):
+        self.number_of_voter += 1
+        curve = self.elliptic_curve
+        self._sum_A = curve._jacobian_add(self._sum_A, curve._to_jacobian(encrypted_message.first))
+        self._sum_B = curve._jacobian_add(self._sum_B, curve._to_jacobian(encrypted_message.second))
+
+    def restore_ballots(self, records: Iterable[BallotRecord]):
+        """
+        Re-add ballots recovered from the ballot log, in their original order, and rebuild the
+        running tally from them. The proofs were verified before the ballots were logged, but
+        the ciphertext points are checked again since they come back from storage; raises
+        ValueError, keeping the ballots before it, if one is not on the curve.
+        """
+        ballots = self.election_data.ballots
+        with self._lock:
+            for record in records:
+                ballots.append_records(record)
+                vote = ballots.vote(len(ballots) - 1)
+                try:
+                    self.elliptic_curve.validate_point(vote.first)
+                    self.elliptic_curve.validate_point(vote.second)
+                except ValueError:
+                    ballots.truncate(len(ballots) - 1)
+                    raise
+                self._add_to_tally(vote)
+
+    @property
+    def votes(self) -> Sequence[EccPointPair]:
+        """Return the accepted ciphertexts."""
+        return self.election_data.voter_vote
+
+    def _verify_signature(self, encrypted_message: EccPointPair, signed_message: int, public_key: IntPair):
+        """Check the voter's signature over the digest of the encrypted message."""
+        digest = digest_of_points([encrypted_message.first, encrypted_message.second])
+        _verify_message(digest, signed_message, public_key)
+
+    def _validate_ballot_points(self, encrypted_message: EccPointPair, proof_of_work: ProofOfWork):
+        """Check once that every point of an incoming ballot lies on the curve."""
+        self.verifier.validate_ballot_points(encrypted_message, proof_of_work)
 
     def _verify_vote(self, encrypted_message: EccPointPair, proof_of_work: ProofOfWork) -> bool:
         """Verify the validity of a vote."""
-        A, B, u, w = proof_of_work.A, proof_of_work.B, proof_of_work.u, proof_of_work.w
-        P, Q = self.P, self.Q
-        Ap, Bp = encrypted_message.first, encrypted_message.second
-
-        if not all(len(lst) == self.number_of_candidate for lst in [A, B, u, w]):
-            raise ValueError("Invalid proof of work dimensions.")
-
-        for i in range(self.number_of_candidate):
-            if A[i] != self.elliptic_curve.add(
-                self.elliptic_curve.multiply(w[i], P),
-                self.elliptic_curve.multiply(u[i], Ap)
-            ):
-                return False
-            if B[i] != self.elliptic_curve.add(
-                self.elliptic_curve.multiply(w[i], Q),
-                self.elliptic_curve.multiply(u[i], self.elliptic_curve.sub(Bp, self.M[i]))
-            ):
-                return False
-
-        challenge = hash_array_of_points(A + B, self.elliptic_curve.p)
-        return challenge == sum(u)
+        return self.verifier.verify_vote(encrypted_message, proof_of_work)
+
+    def encrypted_tally(self) -> EccPointPair:
+        """Return the homomorphic sum of all accepted ciphertexts."""
+        with self._lock:
+            sum_A, sum_B = self._sum_A, self._sum_B
+        return EccPointPair(*self.elliptic_curve.batch_normalize([sum_A, sum_B]))
+
+    def public_summary(self) -> Dict:
+        """Return the ballot count, encrypted tally and any results, without the per-ballot data."""
+        with self._lock:
+            sum_A, sum_B = self._sum_A, self._sum_B
+            number_of_ballots = self.election_data.ballot_count()
+        return {
+            "number_of_candidates": self.number_of_candidate,
+            "maximum_number_of_voters": self.maximum_number_of_voters,
+            "number_of_ballots": number_of_ballots,
+            "encrypted_tally": EccPointPair(*self.elliptic_curve.batch_normalize([sum_A, sum_B])),
+            "encrypted_package": list(self.election_data.encrypted_package),
+            "decrypted_package": list(self.election_data.decrypted_package),
+            "result_package": list(self.election_data.result_package),
+            "results": self.results,
+        }
 
-    def open_vote(self) -> List[int]:
-        """Open the vote and calculate the results."""
-        sum_A = ECCPoint(0, 0, True)
-        sum_B = ECCPoint(0, 0, True)
+    def precompute_tally_table(self, path: str):
+        """
+        Build the baby-step table for the largest possible tally, write it to `path` and
+        memory-map it for open_vote. Only P and the voter bound are involved, so this can
+        run before the polls close.
+        """
+        self.tally_solver.write_table(path)
+        self.load_tally_table(path)
 
-        for _vote in self.votes:
-            sum_A = self.elliptic_curve.add(sum_A, _vote.first)
-            sum_B = self.elliptic_curve.add(sum_B, _vote.second)
+    def load_tally_table(self, path: str):
+        """Memory-map a baby-step table previously written by precompute_tally_table."""
+        self.tally_solver.load_table(path)
 
+    def open_vote(self) -> List[int]:
+        """Open the vote and calculate the results."""
+        decrypted_S, number_of_voter = self.decrypt_tally()
+        return self.record_results(self._solve(decrypted_S, number_of_voter))
+
+    def decrypt_tally(self) -> Tuple[ECCPoint, int]:
+        """Decrypt the running aggregate. Returns the decrypted point and the number of votes in it."""
+        with self._lock:
+            sum_A, sum_B = self._sum_A, self._sum_B
+            number_of_voter = self.number_of_voter
+        sum_A, sum_B = self.elliptic_curve.batch_normalize([sum_A, sum_B])
         self.election_data.encrypted_package.append(EccPointPair(sum_A, sum_B))
         decrypted_S = self.elliptic_curve.sub(
             sum_B,
             self.elliptic_curve.multiply(self._d, sum_A)
         )
         self.election_data.decrypted_package.append(decrypted_S)
+        return decrypted_S, number_of_voter
 
-        self.results = self._solve(decrypted_S, self.M, self.number_of_voter)
+    def record_results(self, results: List[int]) -> List[int]:
+        """Store the solved per-candidate counts."""
+        self.results = results
         self.election_data.result_package.append(self.results)
         self.election_data.results = self.results
         return self.results
 
-    def _solve(self, decrypted_S: ECCPoint, M: List[ECCPoint], n: int) -> List[int]:
+    def _solve(self, decrypted_S: ECCPoint, n: int) -> List[int]:
         """Solve the vote decryption to determine the results."""
-        elliptic_curve = self.elliptic_curve
-        mid = len(M) // 2
-        left_size, right_size = generate_tuple(n, mid), generate_tuple(n, len(M) - mid)
-        data = [dict() for _ in range(n + 1)]
-
-        for tuple_ in left_size:
-            cur_sum = 0
-            pt = ECCPoint(0, 0, True)
-            for i, count in enumerate(tuple_):
-                cur_sum += count
-                pt = elliptic_curve.add(pt, elliptic_curve.multiply(count, M[i]))
-            data[cur_sum][pt] = tuple_
-
-        for tuple_ in right_size:
-            cur_sum = 0
-            pt = ECCPoint(0, 0, True)
-            for i, count in enumerate(tuple_):
-                cur_sum += count
-                pt = elliptic_curve.add(pt, elliptic_curve.multiply(count, M[i + mid]))
-
-            target = elliptic_curve.sub(decrypted_S, pt)
-            if target in data[n - cur_sum]:
-                return data[n - cur_sum][target] + tuple_
-
-        raise ValueError("Failed to solve the vote decryption.")
+        return self.tally_solver.solve(decrypted_S, n)
+
+    def _solve_meet_in_the_middle(self, decrypted_S: ECCPoint, n: int) -> List[int]:
+        """Solve the vote decryption by matching partial tallies of both candidate halves."""
+        return self.tally_solver.solve_meet_in_the_middle(decrypted_S, n)
 
     def public_result(self) -> ElectionData:
         """Return the public election data."""
         return self.election_data
 
 
+metrics.register_timer(sys.modules[__name__], "_verify_message", "signature_check")
+metrics.register_timer(VotingServer, "_add_to_tally", "aggregation")
+metrics.register_timer(VotingServer, "decrypt_tally", "decryption")
+
+
 if __name__ == '__main__':
     from random import randint
     from pprint import pprint
@@ -186,7 +498,7 @@ if __name__ == '__main__':
     cnt = [0 for i in range(number_of_candidate)]
     now = time.time()
     for i in range(5):
-        user = User("user_name", "name", "id")
+        user = User("user_name")
         vote = randint(0, number_of_candidate - 1)
         cnt[vote] += 1
         user_vote = user.vote(vote, voting_server.get_public_key())
@@ -198,5 +510,5 @@ if __name__ == '__main__':
     print(cnt)
     print(voting_server.open_vote() == cnt)
     print(f"Opening vote time: {time.time() - now}")
-    pprint(voting_server.public_result().voter_vote)
+    pprint(list(voting_server.public_result().voter_vote))
     pprint(voting_server.public_result().results)
\ No newline at end of file
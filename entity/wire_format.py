@@ -0,0 +1,273 @@
+from entity.elliptic_curve import ECCPoint
+from entity.election_parameters import CurveParameters
+from entity.types import IntPair, EccPointPair, ProofOfWork
+from entity.voting_server import ElectionData
+from typing import Dict, List, Tuple
+import struct
+
+# Binary layout, all integers big-endian:
+#   point   1 tag byte (0 = point at infinity, 2/3 = parity of y) + x in `coordinate_bytes`
+#   scalar  `scalar_bytes`, reduced modulo the group order
+#   rsa     u16 length + n, u16 length + e; a signature then takes len(n) bytes
+#   proof   u16 k + k points A + k points B + k scalars u + k scalars w
+WIRE_MAGIC = b"EVWD"
+WIRE_VERSION = 1
+_U8 = struct.Struct(">B")
+_U16 = struct.Struct(">H")
+_U32 = struct.Struct(">I")
+
+_TAG_INFINITY = 0
+_TAG_EVEN = 2
+_TAG_ODD = 3
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = memoryview(data)
+        self.offset = 0
+
+    def take(self, size: int) -> bytes:
+        end = self.offset + size
+        if end > len(self.data):
+            raise ValueError("Truncated wire data.")
+        chunk = self.data[self.offset:end].tobytes()
+        self.offset = end
+        return chunk
+
+    def unpack(self, fmt: struct.Struct) -> int:
+        return fmt.unpack(self.take(fmt.size))[0]
+
+    def finish(self):
+        if self.offset != len(self.data):
+            raise ValueError("Trailing bytes after wire data.")
+
+
+class WireCodec:
+    """Binary encoding of ballots and election data with compressed points and fixed-width scalars."""
+
+    def __init__(self, curve: CurveParameters):
+        self.curve = curve
+        self.elliptic_curve = curve.elliptic_curve
+        self.order = curve.order
+        self.coordinate_bytes = curve.coordinate_bytes
+        self.scalar_bytes = curve.scalar_bytes
+        self.point_bytes = 1 + self.coordinate_bytes
+
+    def encode_point(self, point: ECCPoint) -> bytes:
+        """Encode a point as a parity tag and its x-coordinate."""
+        if point.is_origin:
+            return bytes(self.point_bytes)
+        return bytes([_TAG_ODD if point.y & 1 else _TAG_EVEN]) + point.x.to_bytes(self.coordinate_bytes, "big")
+
+    def decode_point(self, data: bytes) -> ECCPoint:
+        """Decode a point written by encode_point."""
+        reader = _Reader(data)
+        point = self._read_point(reader)
+        reader.finish()
+        return point
+
+    def encode_pair(self, pair: EccPointPair) -> bytes:
+        """Encode a ciphertext."""
+        return self.encode_point(pair.first) + self.encode_point(pair.second)
+
+    def decode_pair(self, data: bytes) -> EccPointPair:
+        """Decode a ciphertext written by encode_pair."""
+        reader = _Reader(data)
+        pair = self._read_pair(reader)
+        reader.finish()
+        return pair
+
+    def encode_scalar(self, value: int) -> bytes:
+        """Encode a scalar reduced modulo the group order."""
+        return (value % self.order).to_bytes(self.scalar_bytes, "big")
+
+    def encode_proof(self, proof_of_work: ProofOfWork) -> bytes:
+        """Encode a ballot proof."""
+        out = bytearray()
+        self._write_proof(out, proof_of_work)
+        return bytes(out)
+
+    def decode_proof(self, data: bytes) -> ProofOfWork:
+        """Decode a ballot proof written by encode_proof."""
+        reader = _Reader(data)
+        proof_of_work = self._read_proof(reader)
+        reader.finish()
+        return proof_of_work
+
+    def encode_ballot(self, ballot: Tuple[EccPointPair, IntPair, int, ProofOfWork]) -> bytes:
+        """Encode one (vote, public key, signed message, proof) ballot record."""
+        out = bytearray()
+        self._write_ballot(out, ballot)
+        return bytes(out)
+
+    def decode_ballot(self, data: bytes) -> Tuple[EccPointPair, IntPair, int, ProofOfWork]:
+        """Decode a ballot record written by encode_ballot."""
+        reader = _Reader(data)
+        ballot = self._read_ballot(reader)
+        reader.finish()
+        return ballot
+
+    def encode_election_data(self, election_data: ElectionData) -> bytes:
+        """Encode the public election data."""
+        data = election_data
+        number_of_ballots = data.ballot_count()
+        out = bytearray(WIRE_MAGIC)
+        out += _U8.pack(WIRE_VERSION)
+        out += _U32.pack(number_of_ballots)
+        for ballot in data.iter_ballots(0, number_of_ballots):
+            self._write_ballot(out, ballot)
+
+        out += _U32.pack(len(data.encrypted_package))
+        for pair in data.encrypted_package:
+            out += self.encode_pair(pair)
+        out += _U32.pack(len(data.decrypted_package))
+        for point in data.decrypted_package:
+            out += self.encode_point(point)
+        out += _U32.pack(len(data.result_package))
+        for counts in data.result_package:
+            self._write_counts(out, counts)
+        out += _U8.pack(data.results is not None)
+        if data.results is not None:
+            self._write_counts(out, data.results)
+        return bytes(out)
+
+    def decode_election_data(self, data: bytes) -> ElectionData:
+        """Decode election data written by encode_election_data."""
+        reader = _Reader(data)
+        if reader.take(len(WIRE_MAGIC)) != WIRE_MAGIC or reader.unpack(_U8) != WIRE_VERSION:
+            raise ValueError("Unsupported wire data.")
+
+        election_data = ElectionData(self.elliptic_curve.p, self.order)
+        for _ in range(reader.unpack(_U32)):
+            election_data.add_ballot(*self._read_ballot(reader))
+
+        for _ in range(reader.unpack(_U32)):
+            election_data.encrypted_package.append(self._read_pair(reader))
+        for _ in range(reader.unpack(_U32)):
+            election_data.decrypted_package.append(self._read_point(reader))
+        for _ in range(reader.unpack(_U32)):
+            election_data.result_package.append(self._read_counts(reader))
+        if reader.unpack(_U8):
+            election_data.results = self._read_counts(reader)
+        reader.finish()
+        return election_data
+
+    def election_data_to_primitives(self, election_data: ElectionData) -> Dict:
+        """
+        Return the election data as dicts, lists, ints and bytes, with every point and scalar
+        in its fixed-width binary form, for generic encoders such as msgpack.
+        """
+        data = election_data
+        return {
+            "version": WIRE_VERSION,
+            "ballots": [
+                {
+                    "vote": self.encode_pair(vote),
+                    "public_key": [self._int_bytes(public_key.x), self._int_bytes(public_key.y)],
+                    "signed_message": self._int_bytes(signed_message),
+                    "proof_of_work": self.encode_proof(proof_of_work),
+                }
+                for vote, public_key, signed_message, proof_of_work in data.iter_ballots()
+            ],
+            "encrypted_package": [self.encode_pair(pair) for pair in data.encrypted_package],
+            "decrypted_package": [self.encode_point(point) for point in data.decrypted_package],
+            "result_package": [list(counts) for counts in data.result_package],
+            "results": list(data.results) if data.results is not None else None,
+        }
+
+    def election_data_from_primitives(self, primitives: Dict) -> ElectionData:
+        """Rebuild election data from election_data_to_primitives output."""
+        if primitives.get("version") != WIRE_VERSION:
+            raise ValueError("Unsupported wire data.")
+        election_data = ElectionData(self.elliptic_curve.p, self.order)
+        for ballot in primitives["ballots"]:
+            modulus, exponent = ballot["public_key"]
+            election_data.add_ballot(
+                self.decode_pair(ballot["vote"]),
+                IntPair(int.from_bytes(modulus, "big"), int.from_bytes(exponent, "big")),
+                int.from_bytes(ballot["signed_message"], "big"),
+                self.decode_proof(ballot["proof_of_work"]),
+            )
+        election_data.encrypted_package = [self.decode_pair(pair) for pair in primitives["encrypted_package"]]
+        election_data.decrypted_package = [self.decode_point(point) for point in primitives["decrypted_package"]]
+        election_data.result_package = [list(counts) for counts in primitives["result_package"]]
+        results = primitives["results"]
+        election_data.results = list(results) if results is not None else None
+        return election_data
+
+    def _read_point(self, reader: _Reader) -> ECCPoint:
+        tag = reader.unpack(_U8)
+        x = int.from_bytes(reader.take(self.coordinate_bytes), "big")
+        if tag == _TAG_INFINITY and x == 0:
+            return ECCPoint(0, 0, True)
+        if tag not in (_TAG_EVEN, _TAG_ODD):
+            raise ValueError("Invalid point encoding.")
+
+        curve = self.elliptic_curve
+        p = curve.p
+        if x >= p:
+            raise ValueError("Invalid point encoding.")
+        rhs = (pow(x, 3, p) + curve.a * x + curve.b) % p
+        y = self.curve.square_root(rhs)
+        if y * y % p != rhs:
+            raise ValueError("The point is not on the curve.")
+        if y & 1 != tag - _TAG_EVEN:
+            y = p - y
+        if y == p:
+            raise ValueError("Invalid point encoding.")
+        return ECCPoint(x, y)
+
+    def _read_pair(self, reader: _Reader) -> EccPointPair:
+        return EccPointPair(self._read_point(reader), self._read_point(reader))
+
+    def _write_ballot(self, out: bytearray, ballot: Tuple[EccPointPair, IntPair, int, ProofOfWork]):
+        vote, public_key, signed_message, proof_of_work = ballot
+        out += self.encode_pair(vote)
+        modulus = self._encode_int(public_key.x)
+        out += modulus + self._encode_int(public_key.y)
+        out += signed_message.to_bytes(len(modulus) - _U16.size, "big")
+        self._write_proof(out, proof_of_work)
+
+    def _read_ballot(self, reader: _Reader) -> Tuple[EccPointPair, IntPair, int, ProofOfWork]:
+        vote = self._read_pair(reader)
+        modulus_bytes = reader.unpack(_U16)
+        modulus = int.from_bytes(reader.take(modulus_bytes), "big")
+        exponent = int.from_bytes(reader.take(reader.unpack(_U16)), "big")
+        signed_message = int.from_bytes(reader.take(modulus_bytes), "big")
+        return vote, IntPair(modulus, exponent), signed_message, self._read_proof(reader)
+
+    def _write_proof(self, out: bytearray, proof_of_work: ProofOfWork):
+        A, B, u, w = proof_of_work.A, proof_of_work.B, proof_of_work.u, proof_of_work.w
+        if not len(A) == len(B) == len(u) == len(w):
+            raise ValueError("Invalid proof of work dimensions.")
+        out += _U16.pack(len(A))
+        for point in A + B:
+            out += self.encode_point(point)
+        for value in u + w:
+            out += self.encode_scalar(value)
+
+    def _read_proof(self, reader: _Reader) -> ProofOfWork:
+        k = reader.unpack(_U16)
+        points = [self._read_point(reader) for _ in range(2 * k)]
+        scalars = [int.from_bytes(reader.take(self.scalar_bytes), "big") for _ in range(2 * k)]
+        return ProofOfWork(points[:k], points[k:], scalars[:k], scalars[k:])
+
+    @staticmethod
+    def _int_bytes(value: int) -> bytes:
+        if value < 0:
+            raise ValueError("Negative integers cannot be encoded.")
+        return value.to_bytes(max((value.bit_length() + 7) // 8, 1), "big")
+
+    def _encode_int(self, value: int) -> bytes:
+        encoded = self._int_bytes(value)
+        return _U16.pack(len(encoded)) + encoded
+
+    @staticmethod
+    def _write_counts(out: bytearray, counts: List[int]):
+        out += _U16.pack(len(counts))
+        for count in counts:
+            out += _U32.pack(count)
+
+    @staticmethod
+    def _read_counts(reader: _Reader) -> List[int]:
+        return [reader.unpack(_U32) for _ in range(reader.unpack(_U16))]
@@ -0,0 +1,152 @@
+# Equivalence of the python and gmpy2 field backends (utils/field.py). Arithmetic primitives are
+# checked in-process against plain Python; curve operations, RSA-CRT signatures and a seeded
+# vote -> verify -> open_vote round run in one subprocess per backend, since FIELD is chosen at
+# import, and must produce identical results.
+from utils.field import select_backend
+from utils.math import generate_random_rsa_key
+import json
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKENDS = ["python", pytest.param("gmpy2", marks=pytest.mark.skipif(gmpy2 is None, reason="gmpy2 is not installed"))]
+
+# The service curve (see .env.example): p = 3 (mod 4).
+CURVE = (
+    1268133167195989090596625406312984755854486256116,
+    386736940269827655214118852806596527602892573734,
+    1461501637330902918203684832716283019655932542983,
+    1461501637330902918203684149283858612734394057783,
+)
+# Primes = 1 (mod 4), which take the general Tonelli–Shanks path (P-224's has 2^96 | p - 1).
+TONELLI_PRIMES = [17, 97, 2 ** 255 - 19, 2 ** 224 - 2 ** 96 + 1]
+
+
+@pytest.fixture(params=BACKENDS)
+def field(request):
+    return select_backend(request.param)
+
+
+def test_inverse(field):
+    rng = random.Random(1)
+    p = CURVE[2]
+    for _ in range(200):
+        a = rng.randrange(1, p)
+        assert int(field.inverse(a, p)) == pow(a, -1, p)
+    with pytest.raises(ValueError):
+        field.inverse(6, 9)
+
+
+def test_pow(field):
+    rng = random.Random(2)
+    p = CURVE[2]
+    for _ in range(200):
+        a, exponent = rng.randrange(1, p), rng.randrange(-p, p)
+        assert int(field.pow(a, exponent, p)) == pow(a, exponent, p)
+
+
+def test_legendre(field):
+    for p in [101, CURVE[2]] + TONELLI_PRIMES:
+        for a in range(200):
+            expected = pow(a, (p - 1) // 2, p)
+            assert field.legendre(a, p) == (-1 if expected == p - 1 else expected)
+
+
+def test_sqrt(field):
+    rng = random.Random(3)
+    for p in [13, CURVE[2]] + TONELLI_PRIMES:
+        for _ in range(100):
+            a = rng.randrange(p)
+            root = field.sqrt(a, p)
+            assert type(root) is int
+            if a and pow(a, (p - 1) // 2, p) == 1:
+                assert root * root % p == a
+            else:
+                assert root == 0
+
+
+def _round(rsa_key):
+    """Run the curve, signature and election operations with a seeded RNG; return their results."""
+    from utils.field import FIELD
+    from utils.ecc import square_root, legendre_symbol
+    from entity.election_parameters import CurveParameters
+    from entity.ecc_point import ECCPoint
+    from entity.voting_server import VotingServer
+    from entity.user import User
+
+    random.seed(1234)
+    a, b, p, order = CURVE
+    curve = CurveParameters(a, b, p, order).elliptic_curve
+    x = 2
+    while legendre_symbol((x ** 3 + a * x + b) % p, p) != 1:
+        x += 1
+    G = ECCPoint(x, square_root((x ** 3 + a * x + b) % p, p))
+
+    points = [curve.multiply(random.randrange(1, order), G) for _ in range(40)]
+    scalars = [random.randrange(-order, order) for _ in range(40)]
+    results = {
+        "multiply": points + [curve.multiply(-5, G), curve.multiply(order, G)],
+        "add": [curve.add(points[0], points[1]), curve.add(points[2], points[2]), curve.sub(points[3], points[3])],
+        # Below and above the Pippenger threshold.
+        "multi_multiply": [curve.multi_multiply(scalars[:5], points[:5]), curve.multi_multiply(scalars, points)],
+    }
+
+    user = User("voter", rsa_key=tuple(rsa_key))
+    results["sign"] = [user.sign(random.randrange(1 << 1000)) for _ in range(3)]
+
+    server = VotingServer(4, 30, a, b, p, order, private_key=random.randrange(1, order), base_point=G)
+    ballots = []
+    for candidate in [0, 1, 3, 3, 2]:
+        encrypted_message, signed_message, _, proof_of_work = vote = user.vote(candidate, server.get_public_key())
+        assert server.cast_vote(vote)
+        ballots.append([encrypted_message.first, encrypted_message.second, signed_message, proof_of_work.u, proof_of_work.w])
+    results["vote"] = ballots
+    results["open_vote"] = server.open_vote()
+
+    def encode(value):
+        if isinstance(value, ECCPoint):
+            value = [value.x, value.y, value.is_origin]
+        if isinstance(value, (list, tuple)):
+            return [encode(item) for item in value]
+        # Nothing backend-specific may leave the arithmetic.
+        assert type(value) in (int, bool), f"{type(value).__name__} leaked from the {FIELD.name} backend"
+        return value
+
+    return {"backend": FIELD.name, **{name: encode(value) for name, value in results.items()}}
+
+
+@pytest.fixture(scope="module")
+def rounds():
+    rsa_key = json.dumps(list(generate_random_rsa_key()))
+    results = {}
+    for backend in ["python"] + (["gmpy2"] if gmpy2 is not None else []):
+        env = dict(os.environ, FIELD_BACKEND=backend, PYTHONPATH=REPOSITORY, METRICS_ENABLED="0")
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__)], input=rsa_key, env=env,
+            capture_output=True, text=True, check=True, timeout=600
+        )
+        results[backend] = json.loads(completed.stdout)
+    return results
+
+
+@pytest.mark.parametrize("name", ["multiply", "add", "multi_multiply", "sign", "vote", "open_vote"])
+def test_backends_agree(rounds, name):
+    assert rounds["python"]["backend"] == "python"
+    assert rounds["python"]["open_vote"] == [1, 1, 1, 2]
+    if gmpy2 is None:
+        pytest.skip("gmpy2 is not installed")
+    assert rounds["gmpy2"]["backend"] == "gmpy2"
+    assert rounds["gmpy2"][name] == rounds["python"][name]
+
+
+if __name__ == "__main__":
+    json.dump(_round(json.load(sys.stdin)), sys.stdout)
@@ -0,0 +1,164 @@
+from array import array
+from bisect import bisect_left
+from math import isqrt
+from typing import List, Optional, Sequence
+from entity.elliptic_curve import EllipticCurve, ECCPoint, JACOBIAN_INFINITY, NORMALIZE_BATCH
+from entity.fixed_base_table import FixedBaseTable
+import mmap
+import os
+import struct
+import sys
+
+# Baby-step tables are keyed on the low bits of the x-coordinate; a match is only a
+# candidate and is confirmed with a scalar multiplication before it is returned.
+FINGERPRINT_BITS = 64
+FINGERPRINT_MASK = (1 << FINGERPRINT_BITS) - 1
+
+# Upper limit on the number of baby steps held in a table.
+MAX_BABY_STEPS = 1 << 20
+
+# On-disk layout: header, base point coordinates, then `count` sorted uint64 fingerprints
+# followed by `count` uint32 baby-step indexes, all in the writer's native byte order.
+TABLE_MAGIC = b"EVBSGS"
+TABLE_VERSION = 1
+_HEADER = struct.Struct("<6s2sIIQQ")
+
+
+def baby_steps_for_bound(upper_bound: int) -> int:
+    """Return the number of baby steps that balances table size and giant steps for [0, upper_bound]."""
+    return min(MAX_BABY_STEPS, isqrt(upper_bound // 2) + 1)
+
+
+def _byte_order_tag() -> bytes:
+    return b"LE" if sys.byteorder == "little" else b"BE"
+
+
+class BabyStepTable:
+    """Sorted x-coordinate fingerprints of P, 2P, ..., mP, held in memory or memory-mapped from disk."""
+
+    def __init__(self, baby_steps: int, fingerprints: Sequence[int], indexes: Sequence[int], mapped: Optional[mmap.mmap] = None):
+        self.baby_steps = baby_steps
+        self._fingerprints = fingerprints
+        self._indexes = indexes
+        self._mapped = mapped
+
+    @classmethod
+    def generate(cls, base: FixedBaseTable, baby_steps: int) -> "BabyStepTable":
+        """Compute the fingerprints of the first `baby_steps` multiples of the base point."""
+        curve = base.elliptic_curve
+        point = base.point
+        entries = []
+        current = JACOBIAN_INFINITY
+        for start in range(1, baby_steps + 1, NORMALIZE_BATCH):
+            chunk = []
+            for _ in range(start, min(start + NORMALIZE_BATCH, baby_steps + 1)):
+                current = curve._jacobian_add_affine(current, point.x, point.y)
+                chunk.append(current)
+            for j, affine in enumerate(curve.batch_normalize(chunk), start):
+                entries.append((affine.x & FINGERPRINT_MASK, j))
+        entries.sort()
+        return cls(
+            baby_steps,
+            array("Q", [fingerprint for fingerprint, _ in entries]),
+            array("I", [j for _, j in entries]),
+        )
+
+    def save(self, path: str, base_point: ECCPoint):
+        """Write the table atomically so that it can be memory-mapped later."""
+        coordinate_bytes = (max(base_point.x.bit_length(), base_point.y.bit_length()) + 7) // 8
+        header = _HEADER.pack(
+            TABLE_MAGIC, _byte_order_tag(), TABLE_VERSION, coordinate_bytes, self.baby_steps, len(self._fingerprints)
+        )
+        coordinates = base_point.x.to_bytes(coordinate_bytes, "big") + base_point.y.to_bytes(coordinate_bytes, "big")
+        padding = b"\0" * (-(len(header) + len(coordinates)) % 8)
+
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as f:
+            f.write(header + coordinates + padding)
+            f.write(array("Q", self._fingerprints).tobytes())
+            f.write(array("I", self._indexes).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str, base_point: ECCPoint) -> "BabyStepTable":
+        """Memory-map a table written by `save`, checking that it was built for `base_point`."""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, byte_order, version, coordinate_bytes, baby_steps, count = _HEADER.unpack_from(mapped, 0)
+        if magic != TABLE_MAGIC or version != TABLE_VERSION or byte_order != _byte_order_tag():
+            mapped.close()
+            raise ValueError(f"Unsupported baby-step table: {path}")
+
+        offset = _HEADER.size
+        x = int.from_bytes(mapped[offset:offset + coordinate_bytes], "big")
+        y = int.from_bytes(mapped[offset + coordinate_bytes:offset + 2 * coordinate_bytes], "big")
+        if base_point.is_origin or (x, y) != (base_point.x, base_point.y):
+            mapped.close()
+            raise ValueError(f"Baby-step table {path} was built for a different base point.")
+
+        offset += 2 * coordinate_bytes
+        offset += -offset % 8
+        view = memoryview(mapped)
+        fingerprints = view[offset:offset + 8 * count].cast("Q")
+        indexes = view[offset + 8 * count:offset + 12 * count].cast("I")
+        return cls(baby_steps, fingerprints, indexes, mapped)
+
+    def lookup(self, x: int) -> List[int]:
+        """Return every baby step whose fingerprint matches the x-coordinate."""
+        fingerprint = x & FINGERPRINT_MASK
+        fingerprints = self._fingerprints
+        position = bisect_left(fingerprints, fingerprint)
+        matches = []
+        while position < len(fingerprints) and fingerprints[position] == fingerprint:
+            matches.append(self._indexes[position])
+            position += 1
+        return matches
+
+    def close(self):
+        """Release the memory mapping, if any."""
+        if self._mapped is not None:
+            self._fingerprints.release()
+            self._indexes.release()
+            self._mapped.close()
+            self._mapped = None
+
+
+class BabyStepGiantStep:
+    """
+    Discrete logarithms base a fixed point in a bounded range.
+
+    Since j * P and -j * P share an x-coordinate, a table of m baby steps lets each
+    giant step of length 2m + 1 cover the whole window [i(2m + 1) - m, i(2m + 1) + m].
+    """
+
+    def __init__(self, base: FixedBaseTable, table: BabyStepTable):
+        self.base = base
+        self.elliptic_curve: EllipticCurve = base.elliptic_curve
+        self.table = table
+
+    def solve(self, target: ECCPoint, upper_bound: int) -> int:
+        """Return t in [0, upper_bound] with t * P == target."""
+        curve = self.elliptic_curve
+        if target.is_origin:
+            return 0
+
+        step = 2 * self.table.baby_steps + 1
+        giant = curve._to_jacobian(curve.negation_point(self.base.multiply(step)))
+        current = curve._to_jacobian(target)
+        giant_steps = upper_bound // step + 2
+        for start in range(0, giant_steps, NORMALIZE_BATCH):
+            chunk = []
+            for _ in range(start, min(start + NORMALIZE_BATCH, giant_steps)):
+                chunk.append(current)
+                current = curve._jacobian_add(current, giant)
+            for i, affine in enumerate(curve.batch_normalize(chunk), start):
+                # affine == target - i * step * P
+                if affine.is_origin:
+                    return i * step
+                for j in self.table.lookup(affine.x):
+                    for candidate in (i * step + j, i * step - j):
+                        if 0 <= candidate <= upper_bound and self.base.multiply(candidate) == target:
+                            return candidate
+        raise ValueError("Failed to solve the vote decryption.")
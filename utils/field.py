@@ -0,0 +1,117 @@
+# Modular arithmetic backend for the curve, square root and RSA code. gmpy2's mpz is used when
+# it is installed and plain Python ints otherwise; FIELD_BACKEND=python or gmpy2 forces one.
+#
+# Hot loops convert their operands once with `number` and then use the ordinary operators, which
+# both number types support; inverse, pow and sqrt go through the backend. Every value leaving
+# the arithmetic (point coordinates, signatures, hashes) is converted back to int, so results are
+# identical whichever backend is active.
+from typing import Optional
+import os
+
+try:
+    import gmpy2
+except ImportError:
+    gmpy2 = None
+
+
+class PythonField:
+    """Modular arithmetic on Python ints."""
+
+    name = "python"
+
+    def number(self, value: int) -> int:
+        return value
+
+    def mul(self, a: int, b: int, modulus: int) -> int:
+        return a * b % modulus
+
+    def sqr(self, a: int, modulus: int) -> int:
+        return a * a % modulus
+
+    def inverse(self, a: int, modulus: int) -> int:
+        """Return a^-1 mod modulus; raises ValueError if it does not exist."""
+        return pow(a, -1, modulus)
+
+    def pow(self, a: int, exponent: int, modulus: int) -> int:
+        return pow(a, exponent, modulus)
+
+    def legendre(self, a: int, p: int) -> int:
+        """Return the Legendre symbol (a/p) as -1, 0 or 1."""
+        ls = self.pow(a, (p - 1) // 2, p)
+        return -1 if ls == p - 1 else int(ls)
+
+    def sqrt(self, a: int, p: int) -> int:
+        """
+        Return a square root of `a` modulo the odd prime `p` (Tonelli–Shanks), or 0 if there is
+        none.
+        """
+        a %= p
+        if a == 0 or p == 2 or self.legendre(a, p) != 1:
+            return 0
+        if p % 4 == 3:
+            return int(self.pow(a, (p + 1) // 4, p))
+
+        # Factor p-1 as s * 2^e and find a non-residue n.
+        s, e = p - 1, 0
+        while s % 2 == 0:
+            s //= 2
+            e += 1
+        n = 2
+        while self.legendre(n, p) != -1:
+            n += 1
+
+        x = self.pow(a, (s + 1) // 2, p)
+        b = self.pow(a, s, p)
+        g = self.pow(n, s, p)
+        r = e
+        while True:
+            t, m = b, 0
+            for m in range(r):
+                if t == 1:
+                    break
+                t = t * t % p
+            if m == 0:
+                return int(x)
+            gs = self.pow(g, 1 << (r - m - 1), p)
+            g = gs * gs % p
+            x = x * gs % p
+            b = b * g % p
+            r = m
+
+
+class Gmpy2Field(PythonField):
+    """Modular arithmetic on gmpy2 mpz values."""
+
+    name = "gmpy2"
+
+    def number(self, value: int) -> "gmpy2.mpz":
+        return gmpy2.mpz(value)
+
+    def inverse(self, a: int, modulus: int) -> "gmpy2.mpz":
+        try:
+            return gmpy2.invert(a, modulus)
+        except ZeroDivisionError:
+            raise ValueError("base is not invertible for the given modulus")
+
+    def pow(self, a: int, exponent: int, modulus: int) -> "gmpy2.mpz":
+        if exponent < 0:
+            return gmpy2.powmod(self.inverse(a, modulus), -exponent, modulus)
+        return gmpy2.powmod(a, exponent, modulus)
+
+
+def select_backend(name: Optional[str] = None) -> PythonField:
+    """Return the backend named by `name` or FIELD_BACKEND; "auto" picks gmpy2 if available."""
+    name = (name or os.environ.get("FIELD_BACKEND", "auto")).lower()
+    if name == "python":
+        return PythonField()
+    if name == "gmpy2":
+        if gmpy2 is None:
+            raise ImportError("FIELD_BACKEND=gmpy2 requires the gmpy2 package.")
+        return Gmpy2Field()
+    if name != "auto":
+        raise ValueError(f"Unknown field backend: {name}")
+    return Gmpy2Field() if gmpy2 is not None else PythonField()
+
+
+# Backend used by the curve, square root and RSA code of this process.
+FIELD = select_backend()
@@ -0,0 +1,99 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+from utils.math import generate_random_rsa_key
+import queue
+import threading
+import time
+
+# Number of recent key completions used to estimate the refill rate.
+_RATE_WINDOW = 32
+
+
+class RSAKeyPool:
+    """Bounded pool of RSA key pairs generated ahead of time by background worker processes."""
+
+    def __init__(self, capacity: int = 16, workers: int = 1):
+        if capacity < 1:
+            raise ValueError("Key pool capacity must be positive.")
+        self.capacity = capacity
+        self.workers = workers
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self._keys: "queue.Queue[Tuple[int, int, int]]" = queue.Queue(maxsize=capacity)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed_at: deque = deque(maxlen=_RATE_WINDOW)
+        self._closed = False
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+        self._refill()
+
+    def get(self) -> Tuple[int, int, int]:
+        """Take a pre-generated (p, q, e) triple, generating one synchronously if the pool is empty."""
+        key = self.take()
+        return key if key is not None else generate_random_rsa_key()
+
+    def take(self) -> Optional[Tuple[int, int, int]]:
+        """Take a pre-generated (p, q, e) triple, or return None (counted as a miss) if the pool is empty."""
+        try:
+            key = self._keys.get_nowait()
+            with self._lock:
+                self.hits += 1
+        except queue.Empty:
+            with self._lock:
+                self.misses += 1
+            key = None
+        self._refill()
+        return key
+
+    def _refill(self):
+        """Schedule key generation until queued plus in-flight keys reach the capacity."""
+        with self._lock:
+            if self._closed:
+                return
+            missing = self.capacity - self._keys.qsize() - self._in_flight
+            # Keep at most one job per worker in flight so refills never queue up behind each other.
+            missing = min(missing, self.workers - self._in_flight)
+            for _ in range(max(missing, 0)):
+                self._in_flight += 1
+                self._executor.submit(generate_random_rsa_key).add_done_callback(self._on_generated)
+
+    def _on_generated(self, future: Future):
+        """Store a finished key and keep the pool topped up."""
+        with self._lock:
+            self._in_flight -= 1
+        if future.cancelled() or future.exception() is not None:
+            return
+        try:
+            self._keys.put_nowait(future.result())
+        except queue.Full:
+            return
+        with self._lock:
+            self.generated += 1
+            self._completed_at.append(time.monotonic())
+        self._refill()
+
+    def stats(self) -> Dict:
+        """Return the pool depth, refill rate and hit/miss counters."""
+        with self._lock:
+            completed_at = list(self._completed_at)
+            refill_rate = 0.0
+            if len(completed_at) > 1 and completed_at[-1] > completed_at[0]:
+                refill_rate = (len(completed_at) - 1) / (completed_at[-1] - completed_at[0])
+            return {
+                "depth": self._keys.qsize(),
+                "capacity": self.capacity,
+                "in_flight": self._in_flight,
+                "workers": self.workers,
+                "refill_rate": refill_rate,
+                "generated": self.generated,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def shutdown(self):
+        """Stop the worker processes and drop pending generation jobs."""
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
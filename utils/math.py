@@ -1,7 +1,12 @@
 from Crypto.Util.number import GCD, getPrime
 from random import randint
-from typing import List, Tuple
+from hashlib import sha256
+from typing import Iterator, List, Optional, Tuple
 from entity.elliptic_curve import ECCPoint
+from utils.field import FIELD
+
+# Size of each RSA prime; voter moduli are twice as long.
+RSA_PRIME_BITS = 1024
 
 
 def get_random_relatively_prime_value(q: int) -> int:
@@ -19,8 +24,8 @@ def generate_random_rsa_key() -> Tuple[int, int, int]:
     Generate a random RSA key pair (p, q, e).
     """
     while True:
-        p = getPrime(1024)
-        q = getPrime(1024)
+        p = getPrime(RSA_PRIME_BITS)
+        q = getPrime(RSA_PRIME_BITS)
         e = 65537
         if (p - 1) * (q - 1) % e != 0:
             return p, q, e
@@ -30,7 +35,21 @@ def hash_array_of_points(arr: List[ECCPoint], p: int) -> int:
     """
     Compute a hash value for an array of ECC points modulo `p`.
     """
-    return sum(pow(point.x, point.y, p) for point in arr) % p
+    return int(sum(FIELD.pow(point.x, point.y, p) for point in arr) % p)
+
+
+def digest_of_points(arr: List[ECCPoint]) -> int:
+    """
+    Compute a SHA-256 digest of an array of ECC points as an integer.
+    """
+    h = sha256()
+    for point in arr:
+        if point.is_origin:
+            h.update(b"\x00")
+            continue
+        x, y = point.x.to_bytes((point.x.bit_length() + 7) // 8, "big"), point.y.to_bytes((point.y.bit_length() + 7) // 8, "big")
+        h.update(b"\x01" + len(x).to_bytes(2, "big") + x + len(y).to_bytes(2, "big") + y)
+    return int.from_bytes(h.digest(), "big")
 
 
 def generate_tuple(total: int, n: int) -> List[List[int]]:
@@ -46,5 +65,49 @@ def generate_tuple(total: int, n: int) -> List[List[int]]:
             result.append([i] + sub_tuple)
     return result
 
+
+def iterate_tuple(total: int, n: int) -> Iterator[Tuple[List[int], Optional[int], Optional[int]]]:
+    """
+    Lazily iterate over the same tuples as `generate_tuple(total, n)` in an order where
+    consecutive tuples differ by a single unit move: one entry goes up by one, one goes
+    down by one, or one unit moves between two entries.
+    Yields `(counts, increased, decreased)` with the indexes that changed (None if no
+    entry did). `counts` is one list updated in place; copy it to keep a tuple.
+    """
+    counts = [0] * n
+    yield counts, None, None
+    yield from _walk_tuple(counts, n + 1, total, False)
+
+
+def _walk_tuple(counts: List[int], size: int, total: int, reverse: bool):
+    """
+    Walk coordinates 0..size-1 summing to `total`, where coordinate 0 is the unused slack
+    and coordinate c is counts[c - 1]. A forward walk starts with everything in coordinate
+    0 and ends with everything in coordinate size - 1; a reverse walk does the opposite.
+    """
+    if size == 1:
+        return
+    last = size - 1
+    values = range(total, -1, -1) if reverse else range(total + 1)
+    for position, value in enumerate(values):
+        inner_reverse = (value % 2 == 1) != reverse
+        yield from _walk_tuple(counts, size - 1, total - value, inner_reverse)
+        if position == total:
+            return
+        if not reverse:
+            # The inner walk ended with all of its units in one coordinate; move one to `last`.
+            source, target = (0 if inner_reverse else size - 2), last
+        else:
+            next_inner_reverse = not inner_reverse
+            source, target = last, (size - 2 if next_inner_reverse else 0)
+        increased = target - 1 if target else None
+        decreased = source - 1 if source else None
+        if increased is not None:
+            counts[increased] += 1
+        if decreased is not None:
+            counts[decreased] -= 1
+        yield counts, increased, decreased
+
+
 if __name__ == '__main__':
     print(generate_tuple(4, 1))
\ No newline at end of file
@@ -0,0 +1,302 @@
+# Opt-in instrumentation: operation counters, per-stage latency histograms exported in the
+# Prometheus text format, and a sampling profiler.
+#
+# Modules register the functions to instrument (register_counter / register_timer) when they
+# are imported. Only enable() replaces them with counting or timing wrappers, so while metrics
+# are disabled (the default, see METRICS_ENABLED) the hot paths run exactly the original code.
+from collections import Counter
+from contextvars import ContextVar, Token
+from concurrent.futures import Executor, Future
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import os
+import sys
+import threading
+import time
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Seconds between stack samples of the sampling profiler.
+DEFAULT_SAMPLE_INTERVAL = 0.001
+
+COUNTER_METRIC = "evoting_ecc_operations_total"
+HISTOGRAM_METRIC = "evoting_stage_duration_seconds"
+
+
+class MetricsRegistry:
+    """Thread-safe operation counters and per-stage latency histograms."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        # Per stage: count in each bucket (plus one for +Inf), sum of observations.
+        self._histograms: Dict[str, Tuple[List[int], float]] = {}
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, stage: str, seconds: float):
+        index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        with self._lock:
+            counts, total = self._histograms.get(stage) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._histograms[stage] = (counts, total + seconds)
+
+    def snapshot(self) -> Dict:
+        """Return a picklable copy of the counters and histograms."""
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {stage: (list(counts), total) for stage, (counts, total) in self._histograms.items()},
+            }
+
+    def drain(self) -> Dict:
+        """Return a snapshot and reset the registry."""
+        with self._lock:
+            snapshot = {"counters": self._counters, "histograms": self._histograms}
+            self._counters, self._histograms = {}, {}
+        return snapshot
+
+    def merge(self, snapshot: Dict):
+        """Add a snapshot taken elsewhere, e.g. in a worker process."""
+        with self._lock:
+            for name, amount in snapshot["counters"].items():
+                self._counters[name] = self._counters.get(name, 0) + amount
+            for stage, (counts, total) in snapshot["histograms"].items():
+                own_counts, own_total = self._histograms.get(stage) or ([0] * len(counts), 0.0)
+                self._histograms[stage] = ([a + b for a, b in zip(own_counts, counts)], own_total + total)
+
+    def render(self) -> str:
+        """Return the metrics in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {COUNTER_METRIC} Elliptic curve operations performed.",
+            f"# TYPE {COUNTER_METRIC} counter",
+        ]
+        for name, amount in sorted(snapshot["counters"].items()):
+            lines.append(f'{COUNTER_METRIC}{{op="{name}"}} {amount}')
+        lines += [
+            f"# HELP {HISTOGRAM_METRIC} Latency of election processing stages.",
+            f"# TYPE {HISTOGRAM_METRIC} histogram",
+        ]
+        for stage, (counts, total) in sorted(snapshot["histograms"].items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{HISTOGRAM_METRIC}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+            lines.append(f'{HISTOGRAM_METRIC}_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{HISTOGRAM_METRIC}_count{{stage="{stage}"}} {cumulative}')
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# (owner, attribute, wrapper factory) of every registered function; owners are classes or modules.
+_instrumented: List[Tuple[object, str, Callable[[Callable], Callable]]] = []
+_originals: Dict[Tuple[int, str], Callable] = {}
+_enabled = False
+# Profiler of the request being handled; threadpool calls and worker tasks started for it are sampled too.
+_current_profiler: "ContextVar[Optional[SamplingProfiler]]" = ContextVar("current_profiler", default=None)
+
+
+def _counting(name: str) -> Callable[[Callable], Callable]:
+    def wrap(fn: Callable) -> Callable:
+        @wraps(fn)
+        def counted(*args, **kwargs):
+            REGISTRY.increment(name)
+            return fn(*args, **kwargs)
+        return counted
+    return wrap
+
+
+def _timing(stage: str) -> Callable[[Callable], Callable]:
+    def wrap(fn: Callable) -> Callable:
+        @wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                REGISTRY.observe(stage, time.perf_counter() - start)
+        return timed
+    return wrap
+
+
+def _install(owner: object, attribute: str, wrap: Callable[[Callable], Callable]):
+    original = owner.__dict__[attribute] if isinstance(owner, type) else getattr(owner, attribute)
+    _originals[id(owner), attribute] = original
+    setattr(owner, attribute, wrap(original))
+
+
+def _register(owner: object, attribute: str, wrap: Callable[[Callable], Callable]):
+    _instrumented.append((owner, attribute, wrap))
+    if _enabled:
+        _install(owner, attribute, wrap)
+
+
+def register_counter(owner: object, attribute: str, name: str):
+    """Count calls of `owner.attribute` under `name` while metrics are enabled."""
+    _register(owner, attribute, _counting(name))
+
+
+def register_timer(owner: object, attribute: str, stage: str):
+    """Record the latency of `owner.attribute` as `stage` while metrics are enabled."""
+    _register(owner, attribute, _timing(stage))
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable():
+    """Install the wrappers of every registered function."""
+    global _enabled
+    if not _enabled:
+        _enabled = True
+        for owner, attribute, wrap in _instrumented:
+            _install(owner, attribute, wrap)
+
+
+def disable():
+    """Restore the original functions."""
+    global _enabled
+    if _enabled:
+        _enabled = False
+        for owner, attribute, _ in _instrumented:
+            setattr(owner, attribute, _originals.pop((id(owner), attribute)))
+
+
+def _call_collecting(fn: Callable, args: Tuple, collect_metrics: bool,
+                     profile_interval: Optional[float]) -> Tuple[object, Optional[Dict], Optional[Dict[str, int]]]:
+    """
+    Run fn(*args) in a worker process, returning its result, the metrics it recorded (if
+    collect_metrics) and its sampled stacks (if profile_interval is set).
+    """
+    if collect_metrics:
+        enable()
+        # Forked workers inherit the parent's counts, and a worker's own set-up is no task's work;
+        # workers run one task at a time, so only this call's metrics are sent back.
+        REGISTRY.drain()
+    profiler = None
+    if profile_interval is not None:
+        profiler = SamplingProfiler(profile_interval, {threading.get_ident()}).start()
+    try:
+        result = fn(*args)
+    finally:
+        if profiler is not None:
+            profiler.thread_ids.clear()
+            profiler.stop()
+    return result, REGISTRY.drain() if collect_metrics else None, dict(profiler.stacks()) if profiler else None
+
+
+def _merge_result(future: Future, collected: Future, profiler: Optional["SamplingProfiler"]):
+    if collected.exception() is not None:
+        future.set_exception(collected.exception())
+        return
+    result, snapshot, stacks = collected.result()
+    if snapshot is not None:
+        REGISTRY.merge(snapshot)
+    if stacks is not None:
+        profiler.merge(stacks)
+    future.set_result(result)
+
+
+def submit(executor: Executor, fn: Callable, *args) -> Future:
+    """
+    Submit fn(*args) to a process pool. While metrics are enabled, what the call records in the
+    worker is sent back with its result and merged into this process's registry; a call made for
+    a profiled request is sampled in the worker and its stacks are added to that request's profile.
+    """
+    profiler = _current_profiler.get()
+    if not _enabled and profiler is None:
+        return executor.submit(fn, *args)
+    future: Future = Future()
+    collecting = executor.submit(_call_collecting, fn, args, _enabled, profiler.interval if profiler else None)
+    collecting.add_done_callback(lambda collected: _merge_result(future, collected, profiler))
+    return future
+
+
+def call_profiled(fn: Callable, *args, **kwargs):
+    """Call fn, sampling the calling thread meanwhile if it works for a profiled request."""
+    profiler = _current_profiler.get()
+    if profiler is None or profiler.thread_ids is None:
+        return fn(*args, **kwargs)
+    thread_id = threading.get_ident()
+    profiler.thread_ids.add(thread_id)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        profiler.thread_ids.discard(thread_id)
+
+
+class SamplingProfiler:
+    """
+    Samples the Python stacks of the other threads of this process (or only of `thread_ids`,
+    which may change while sampling) at a fixed interval and counts them in the folded format
+    used by flame graph tools ("outer;...;inner count").
+
+    While attached, call_profiled and submit extend the sampling to the threadpool threads and
+    worker processes doing work for the attaching context.
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL, thread_ids: Optional[Set[int]] = None):
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    def start(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> "SamplingProfiler":
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def attach(self) -> Token:
+        """Make this the profiler of the current context; pass the token to detach."""
+        return _current_profiler.set(self)
+
+    @staticmethod
+    def detach(token: Token):
+        _current_profiler.reset(token)
+
+    def merge(self, stacks: Dict[str, int]):
+        """Add stacks sampled elsewhere, e.g. in a worker process."""
+        with self._lock:
+            self._stacks.update(stacks)
+
+    def stacks(self) -> Counter:
+        """Return a copy of the sampled stack counts."""
+        with self._lock:
+            return Counter(self._stacks)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                with self._lock:
+                    self._stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def folded(self) -> str:
+        """Return the sampled stacks, most frequent first, one per line."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks().most_common())
+
+
+if os.environ.get("METRICS_ENABLED", "").lower() in ("1", "true", "yes"):
+    enable()